@@ -8,11 +8,16 @@ from pathlib import Path
 # API Configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
+# Uvicorn worker processes; each loads its own models, and more than one
+# needs REDIS_URL so all workers share conversation history
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
 
 # LLM Configuration
 LLAMA_CPP_HOST = os.getenv("LLAMA_CPP_HOST", "localhost")
 LLAMA_CPP_PORT = int(os.getenv("LLAMA_CPP_PORT", "8001"))
 LLAMA_CPP_URL = f"http://{LLAMA_CPP_HOST}:{LLAMA_CPP_PORT}/v1/chat/completions"
+# Must match the server's --parallel setting (see scripts/start_llm.sh)
+LLAMA_CPP_SLOTS = int(os.getenv("LLAMA_CPP_SLOTS", "1"))
 
 # Model Settings
 DEFAULT_TEMPERATURE = 0.8
@@ -22,20 +27,35 @@ DEFAULT_REPEAT_PENALTY = 1.1
 
 # Conversation Settings
 MAX_CONVERSATION_HISTORY = 6  # Keep last N exchanges
+# Store history in Redis (shared by all workers, survives restarts) when set,
+# e.g. redis://localhost:6379/0; otherwise history is kept in process memory
+REDIS_URL = os.getenv("REDIS_URL", "")
+# Raw text messages longer than this are rejected before whitespace cleanup
+# (the 1000-character limit applies to the cleaned text)
+MAX_RAW_TEXT_LENGTH = int(os.getenv("MAX_RAW_TEXT_LENGTH", "100000"))
 
 # STT Configuration
 WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL", "small")  # tiny, base, small, medium
-WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")  # cpu or cuda
-WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")  # int8, float16, float32
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "auto")  # auto, cpu or cuda
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "auto")  # auto (float16 on GPU, int8 on CPU), int8, float16, float32
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "2"))  # Concurrent transcriptions
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # Threads per transcription on CPU (0 = CTranslate2 default)
+WAKE_WHISPER_MODEL_SIZE = os.getenv("WAKE_WHISPER_MODEL", "tiny")  # Model for /wake keyword spotting
 
 # TTS Configuration
 TTS_ENGINE = os.getenv("TTS_ENGINE", "piper")  # piper or openvoice
 TTS_VOICE = os.getenv("TTS_VOICE", "en_US-lessac-medium")
+TTS_AUDIO_FORMAT = os.getenv("TTS_AUDIO_FORMAT", "wav")  # wav, or opus (requires ffmpeg)
+# Keep one Piper process (voice model loaded once) instead of one per utterance
+TTS_PIPER_PERSISTENT = os.getenv("TTS_PIPER_PERSISTENT", "false").lower() == "true"
 
 # File Storage
 BASE_DIR = Path(__file__).parent
 AUDIO_OUTPUT_DIR = BASE_DIR / "audio_output"
 AUDIO_OUTPUT_DIR.mkdir(exist_ok=True)
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", "500"))  # Evict least recently used beyond this
+AUDIO_CACHE_MAX_AGE_HOURS = int(os.getenv("AUDIO_CACHE_MAX_AGE_HOURS", "24"))
+AUDIO_CLEANUP_INTERVAL = int(os.getenv("AUDIO_CLEANUP_INTERVAL", "3600"))  # Seconds between cleanup runs
 
 # RAG Configuration
 RAG_ENABLED = os.getenv("RAG_ENABLED", "true").lower() == "true"
@@ -66,6 +86,10 @@ Rules:
 - Be warm, friendly, and engaging.
 """
 
+# Prebuilt system message, shared by every request that needs no extra
+# context (treat as read-only)
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
 # Expression Mapping
 EXPRESSION_EMOTIONS = {
     "smile": "warm",
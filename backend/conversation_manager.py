@@ -3,13 +3,47 @@ Conversation Manager for Lucy AI Companion
 Handles conversation history and context management
 """
 
-from typing import List, Dict, Optional
+import asyncio
+import json
+import sys
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Dict, Optional, Tuple, Union
 from datetime import datetime
+import time
+
+# Optional dependency – only needed for the Redis-backed store
+try:
+    import redis
+    _REDIS_AVAILABLE = True
+except ImportError:
+    redis = None  # type: ignore[assignment]
+    _REDIS_AVAILABLE = False
+
+# Stored message: (role, content). A 2-tuple is several times smaller than
+# a {"role", "content"} dict; dicts are only built when history is read.
+Message = Tuple[str, str]
+
+# Number of lock stripes shared by all users (must be a power of two)
+LOCK_STRIPES = 64
+
+
+@dataclass(slots=True)
+class UserMeta:
+    """Per-user conversation metadata"""
+    created_at: str
+    message_count: int = 0
+    last_updated_ts: Optional[float] = None
+    cleared_at: Optional[str] = None
 
 
 class ConversationManager:
     """Manage conversation history for multiple users"""
     
+    # Whether the store methods do network I/O; async callers then run
+    # them in a worker thread instead of on the event loop
+    blocking_io = False
+    
     def __init__(self, max_history: int = 6):
         """
         Initialize conversation manager
@@ -18,8 +52,61 @@ class ConversationManager:
             max_history: Maximum number of exchanges to keep (default: 6)
         """
         self.max_history = max_history
-        self.conversations: Dict[str, List[Dict]] = {}
-        self.metadata: Dict[str, Dict] = {}
+        # Keep last N exchanges = 2N messages; the bounded deque evicts the
+        # oldest message on append, so no trimming pass is needed
+        self._max_messages = max_history * 2
+        # Striped per-user locks: users hashing to different stripes never
+        # wait on each other, and memory stays fixed regardless of user count
+        self._locks = [asyncio.Lock() for _ in range(LOCK_STRIPES)]
+        self._init_store()
+    
+    def _init_store(self):
+        """Create the in-memory history, metadata and prefix cache"""
+        self.conversations: Dict[str, Deque[Message]] = {}
+        self.metadata: Dict[str, UserMeta] = {}
+        # Per-user [system, *history] message list reused across turns until
+        # the history changes; None disables it (history stored elsewhere)
+        self._prefix_cache: Optional[Dict[str, List[Dict]]] = {}
+    
+    def get_lock(self, user_id: str) -> asyncio.Lock:
+        """
+        Get the lock guarding a user's history
+        
+        Callers hold it around read-then-append sequences (format_for_llm
+        followed by add_message, clear_history) so concurrent requests for
+        the same user cannot interleave. The methods themselves stay
+        synchronous and rely on the caller's lock.
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            asyncio.Lock shared by all users in the same stripe
+        """
+        return self._locks[hash(user_id) & (LOCK_STRIPES - 1)]
+    
+    def _get_conversation(self, user_id: str) -> Deque[Message]:
+        """
+        Get the message deque for a user, creating it on first use
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            Bounded deque of (role, content) tuples
+        """
+        conversation = self.conversations.get(user_id)
+        if conversation is None:
+            conversation = deque(maxlen=self._max_messages)
+            self.conversations[user_id] = conversation
+            self.metadata[user_id] = UserMeta(
+                created_at=datetime.now().isoformat()
+            )
+        return conversation
+    
+    def _load_history(self, user_id: str):
+        """Return the stored (role, content) messages for a user"""
+        return self._get_conversation(user_id)
     
     def get_history(self, user_id: str) -> List[Dict]:
         """
@@ -31,13 +118,10 @@ class ConversationManager:
         Returns:
             List of message dictionaries with role and content
         """
-        if user_id not in self.conversations:
-            self.conversations[user_id] = []
-            self.metadata[user_id] = {
-                "created_at": datetime.now().isoformat(),
-                "message_count": 0
-            }
-        return self.conversations[user_id]
+        return [
+            {"role": role, "content": content}
+            for role, content in self._load_history(user_id)
+        ]
     
     def add_message(self, user_id: str, role: str, content: str):
         """
@@ -48,27 +132,26 @@ class ConversationManager:
             role: Message role ("user" or "assistant")
             content: Message content
         """
-        if user_id not in self.conversations:
-            self.conversations[user_id] = []
-            self.metadata[user_id] = {
-                "created_at": datetime.now().isoformat(),
-                "message_count": 0
-            }
-        
-        # Add message
-        self.conversations[user_id].append({
-            "role": role,
-            "content": content
-        })
+        # Add message (drops the oldest one once the history is full)
+        self._get_conversation(user_id).append((role, content))
+        self._prefix_cache.pop(user_id, None)
         
-        # Update metadata
-        self.metadata[user_id]["message_count"] += 1
-        self.metadata[user_id]["last_updated"] = datetime.now().isoformat()
+        # Update metadata (timestamp is formatted lazily in get_metadata)
+        meta = self.metadata[user_id]
+        meta.message_count += 1
+        meta.last_updated_ts = time.time()
+    
+    def add_exchange(self, user_id: str, user_message: str, response: str):
+        """
+        Add a user message and the assistant's reply to history
         
-        # Trim history if needed (keep last N exchanges = 2N messages)
-        max_messages = self.max_history * 2
-        if len(self.conversations[user_id]) > max_messages:
-            self.conversations[user_id] = self.conversations[user_id][-max_messages:]
+        Args:
+            user_id: User identifier
+            user_message: Message sent by the user
+            response: Assistant reply
+        """
+        self.add_message(user_id, "user", user_message)
+        self.add_message(user_id, "assistant", response)
     
     def clear_history(self, user_id: str):
         """
@@ -78,9 +161,17 @@ class ConversationManager:
             user_id: User identifier
         """
         if user_id in self.conversations:
-            self.conversations[user_id] = []
-            self.metadata[user_id]["cleared_at"] = datetime.now().isoformat()
-            self.metadata[user_id]["message_count"] = 0
+            self.conversations[user_id].clear()
+            self._prefix_cache.pop(user_id, None)
+            meta = self.metadata[user_id]
+            meta.cleared_at = datetime.now().isoformat()
+            meta.message_count = 0
+    
+    def clear_all(self):
+        """Forget every user's history and metadata"""
+        self.conversations.clear()
+        self.metadata.clear()
+        self._prefix_cache.clear()
     
     def get_metadata(self, user_id: str) -> Optional[Dict]:
         """
@@ -92,25 +183,74 @@ class ConversationManager:
         Returns:
             Metadata dictionary or None
         """
-        return self.metadata.get(user_id)
+        meta = self.metadata.get(user_id)
+        if meta is None:
+            return None
+        return self._format_metadata(meta)
+    
+    @staticmethod
+    def _format_metadata(meta: UserMeta) -> Dict:
+        """Convert stored metadata to the public dictionary form"""
+        result = {
+            "created_at": meta.created_at,
+            "message_count": meta.message_count
+        }
+        if meta.last_updated_ts is not None:
+            result["last_updated"] = datetime.fromtimestamp(
+                meta.last_updated_ts
+            ).isoformat()
+        if meta.cleared_at is not None:
+            result["cleared_at"] = meta.cleared_at
+        return result
     
-    def format_for_llm(self, user_id: str, system_prompt: str, 
+    def format_for_llm(self, user_id: str, system_prompt: Union[str, Dict],
                        new_message: str) -> List[Dict]:
         """
         Format conversation history for LLM input
         
         Args:
             user_id: User identifier
-            system_prompt: System prompt to prepend
+            system_prompt: System prompt to prepend, or a prebuilt system
+                message dict (used as-is, not copied)
             new_message: New user message to append
             
         Returns:
-            Complete message list ready for LLM
+            Complete message list ready for LLM (a new list; the message
+            dicts are shared with later calls and must not be modified)
         """
-        messages = [{"role": "system", "content": system_prompt}]
-        messages.extend(self.get_history(user_id))
-        messages.append({"role": "user", "content": new_message})
-        return messages
+        if isinstance(system_prompt, str):
+            # Interned, so the cached prompt is matched by identity
+            system_prompt = sys.intern(system_prompt)
+        
+        cache = self._prefix_cache
+        prefix = cache.get(user_id) if cache is not None else None
+        if prefix is None or not self._same_system(prefix[0], system_prompt):
+            prefix = self._build_prefix(user_id, system_prompt)
+            if cache is not None:
+                cache[user_id] = prefix
+        
+        return [*prefix, {"role": "user", "content": new_message}]
+    
+    def _build_prefix(self, user_id: str,
+                      system_prompt: Union[str, Dict]) -> List[Dict]:
+        """Build the [system, *history] part of the LLM message list"""
+        history = self._load_history(user_id)
+        
+        # Size the list once for system + history
+        prefix: List[Optional[Dict]] = [None] * (len(history) + 1)
+        if isinstance(system_prompt, str):
+            system_prompt = {"role": "system", "content": system_prompt}
+        prefix[0] = system_prompt
+        for i, (role, content) in enumerate(history, 1):
+            prefix[i] = {"role": role, "content": content}
+        return prefix
+    
+    @staticmethod
+    def _same_system(cached: Dict, system_prompt: Union[str, Dict]) -> bool:
+        """Check whether a cached system message matches the requested one"""
+        if isinstance(system_prompt, str):
+            return cached["content"] is system_prompt
+        return cached is system_prompt
     
     def get_exchange_count(self, user_id: str) -> int:
         """
@@ -122,8 +262,7 @@ class ConversationManager:
         Returns:
             Number of exchanges
         """
-        history = self.get_history(user_id)
-        return len(history) // 2
+        return len(self._get_conversation(user_id)) // 2
     
     def export_history(self, user_id: str) -> Dict:
         """
@@ -152,6 +291,168 @@ class ConversationManager:
         return list(self.conversations.keys())
 
 
+class RedisConversationManager(ConversationManager):
+    """
+    Conversation store backed by Redis
+    
+    History survives restarts and is shared by every uvicorn worker. Each
+    user has a list of JSON-encoded [role, content] pairs trimmed to the
+    last max_history exchanges, plus a hash of metadata. Every update is a
+    single MULTI/EXEC pipeline, so concurrent workers never tear state.
+    
+    Every method is a blocking network call; async code must run them in a
+    worker thread (see blocking_io).
+    """
+    
+    blocking_io = True
+    
+    def __init__(self, redis_url: str, max_history: int = 6,
+                 key_prefix: str = "lucy:"):
+        """
+        Initialize Redis conversation manager
+        
+        Args:
+            redis_url: Redis connection URL (e.g. redis://localhost:6379/0)
+            max_history: Maximum number of exchanges to keep (default: 6)
+            key_prefix: Prefix for all keys written by this manager
+            
+        Raises:
+            ImportError: If the redis package is not installed
+        """
+        if not _REDIS_AVAILABLE:
+            raise ImportError(
+                "redis is not installed. Install with: pip install redis"
+            )
+        super().__init__(max_history=max_history)
+        self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        self._prefix = key_prefix
+    
+    def _init_store(self):
+        """History lives in Redis; keep no in-memory copy"""
+        # Other workers write to the same history, so never reuse a prefix
+        self._prefix_cache = None
+    
+    def _history_key(self, user_id: str) -> str:
+        return f"{self._prefix}hist:{user_id}"
+    
+    def _meta_key(self, user_id: str) -> str:
+        return f"{self._prefix}meta:{user_id}"
+    
+    def _load_history(self, user_id: str) -> List[Message]:
+        """Fetch the stored (role, content) messages for a user"""
+        return [
+            tuple(json.loads(item))
+            for item in self._redis.lrange(self._history_key(user_id), 0, -1)
+        ]
+    
+    def add_message(self, user_id: str, role: str, content: str):
+        """
+        Add a message to conversation history
+        
+        Args:
+            user_id: User identifier
+            role: Message role ("user" or "assistant")
+            content: Message content
+        """
+        self._append(user_id, [role, content])
+    
+    def add_exchange(self, user_id: str, user_message: str, response: str):
+        """
+        Add a user message and the assistant's reply in one round trip
+        
+        Args:
+            user_id: User identifier
+            user_message: Message sent by the user
+            response: Assistant reply
+        """
+        self._append(user_id, ["user", user_message], ["assistant", response])
+    
+    def _append(self, user_id: str, *messages: List[str]):
+        """Push [role, content] pairs and update metadata in one pipeline"""
+        history_key = self._history_key(user_id)
+        meta_key = self._meta_key(user_id)
+        
+        pipe = self._redis.pipeline()
+        pipe.rpush(history_key, *(json.dumps(m) for m in messages))
+        pipe.ltrim(history_key, -self._max_messages, -1)
+        pipe.hsetnx(meta_key, "created_at", datetime.now().isoformat())
+        pipe.hincrby(meta_key, "message_count", len(messages))
+        pipe.hset(meta_key, "last_updated_ts", time.time())
+        pipe.execute()
+    
+    def clear_history(self, user_id: str):
+        """
+        Clear conversation history for a user
+        
+        Args:
+            user_id: User identifier
+        """
+        meta_key = self._meta_key(user_id)
+        if not self._redis.exists(meta_key):
+            return
+        
+        pipe = self._redis.pipeline()
+        pipe.delete(self._history_key(user_id))
+        pipe.hset(meta_key, mapping={
+            "cleared_at": datetime.now().isoformat(),
+            "message_count": 0
+        })
+        pipe.execute()
+    
+    def clear_all(self):
+        """Forget every user's history and metadata"""
+        keys = list(self._redis.scan_iter(match=f"{self._prefix}*"))
+        if keys:
+            self._redis.delete(*keys)
+    
+    def get_metadata(self, user_id: str) -> Optional[Dict]:
+        """
+        Get metadata for a user's conversation
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            Metadata dictionary or None
+        """
+        fields = self._redis.hgetall(self._meta_key(user_id))
+        if not fields:
+            return None
+        
+        last_updated = fields.get("last_updated_ts")
+        return self._format_metadata(UserMeta(
+            created_at=fields["created_at"],
+            message_count=int(fields.get("message_count", 0)),
+            last_updated_ts=float(last_updated) if last_updated else None,
+            cleared_at=fields.get("cleared_at")
+        ))
+    
+    def get_exchange_count(self, user_id: str) -> int:
+        """
+        Get number of exchanges (user+assistant pairs) in history
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            Number of exchanges
+        """
+        return self._redis.llen(self._history_key(user_id)) // 2
+    
+    def list_users(self) -> List[str]:
+        """
+        Get list of all user IDs with conversation history
+        
+        Returns:
+            List of user IDs
+        """
+        meta_prefix = self._meta_key("")
+        return [
+            key[len(meta_prefix):]
+            for key in self._redis.scan_iter(match=f"{meta_prefix}*")
+        ]
+
+
 # Example usage
 if __name__ == "__main__":
     manager = ConversationManager(max_history=3)
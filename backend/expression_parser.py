@@ -4,22 +4,28 @@ Extracts emotion tags from LLM responses and cleans text for TTS
 """
 
 import re
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+
+# Expression tags look like *smile*. The negated class is equivalent to the
+# lazy ".*?" (a tag never spans a newline) but matches without backtracking.
+_EXPR_RE = re.compile(r"\*([^*\n]*)\*")
 
 
 class ExpressionParser:
     """Parse and extract expression tags from model output"""
     
     # Supported expressions that map to animation triggers
-    SUPPORTED_EXPRESSIONS = [
+    # (a frozenset so every tag check is a single hash lookup)
+    SUPPORTED_EXPRESSIONS = frozenset({
         "smile", "smirk", "pout", "giggle", "laugh", 
         "blush", "shy", "angry", "surprised", "thinking",
         "excited", "happy", "sad", "worried", "confused"
-    ]
+    })
     
     def __init__(self):
         """Initialize expression parser"""
-        self.expression_pattern = re.compile(r"\*(.*?)\*")
+        self.expression_pattern = _EXPR_RE
     
     def parse(self, text: str) -> Tuple[List[str], str]:
         """
@@ -41,23 +47,25 @@ class ExpressionParser:
         Returns:
             Tuple of (expressions list, clean text)
         """
-        # Extract all expressions
-        expressions = self.expression_pattern.findall(text)
+        # No '*' means no tags: skip the regex scan entirely
+        if "*" not in text:
+            return [], " ".join(text.split())
         
-        # Normalize expressions (lowercase and strip whitespace)
-        expressions = [expr.lower().strip() for expr in expressions]
+        # Single pass: sub() drops each tag while the callback collects it
+        valid_expressions = []
+        supported = self.SUPPORTED_EXPRESSIONS
         
-        # Filter to only supported expressions
-        valid_expressions = [
-            expr for expr in expressions 
-            if expr in self.SUPPORTED_EXPRESSIONS
-        ]
+        def _collect(match) -> str:
+            # Normalize and keep only supported expressions
+            expr = match.group(1).lower().strip()
+            if expr in supported:
+                valid_expressions.append(expr)
+            return ""
         
-        # Remove expression tags from text
-        clean_text = self.expression_pattern.sub("", text).strip()
+        stripped = _EXPR_RE.sub(_collect, text)
         
         # Remove extra whitespace and normalize newlines
-        clean_text = " ".join(clean_text.split())
+        clean_text = " ".join(stripped.split())
         
         return valid_expressions, clean_text
     
@@ -71,9 +79,11 @@ class ExpressionParser:
         Returns:
             Clean text without expression tags
         """
-        clean_text = self.expression_pattern.sub("", text).strip()
-        clean_text = " ".join(clean_text.split())
-        return clean_text
+        if "*" not in text:
+            return " ".join(text.split())
+        
+        clean_text = self.expression_pattern.sub("", text)
+        return " ".join(clean_text.split())
     
     def extract_expressions(self, text: str) -> List[str]:
         """
@@ -85,9 +95,13 @@ class ExpressionParser:
         Returns:
             List of valid expressions
         """
-        expressions = self.expression_pattern.findall(text)
-        expressions = [expr.lower().strip() for expr in expressions]
-        return [expr for expr in expressions if expr in self.SUPPORTED_EXPRESSIONS]
+        if "*" not in text:
+            return []
+        
+        return [
+            expr for raw in self.expression_pattern.findall(text)
+            if (expr := raw.lower().strip()) in self.SUPPORTED_EXPRESSIONS
+        ]
     
     @staticmethod
     def is_valid_expression(expression: str) -> bool:
@@ -103,6 +117,100 @@ class ExpressionParser:
         return expression.lower().strip() in ExpressionParser.SUPPORTED_EXPRESSIONS
 
 
+class StreamingExpressionParser:
+    """
+    Incrementally parse streamed model output into sentence-sized chunks
+    
+    Text deltas are consumed in a single pass as they arrive. Expression
+    tags are collected, and each time a sentence completes (., ! or ?
+    followed by whitespace, or a newline) its expressions and clean text
+    are returned, ready for TTS. Boundaries inside a tag never split it.
+    """
+    
+    _SENTENCE_PUNCT = frozenset(".!?")
+    
+    def __init__(self, supported=ExpressionParser.SUPPORTED_EXPRESSIONS):
+        """
+        Initialize streaming parser
+        
+        Args:
+            supported: Expressions to keep (others are dropped)
+        """
+        self.supported = supported
+        self._text: List[str] = []         # Clean text of current sentence
+        self._expressions: List[str] = []  # Expressions in current sentence
+        self._tag: Optional[List[str]] = None  # Open tag characters, if any
+        self._after_punct = False          # Last text char was . ! or ?
+    
+    def feed(self, delta: str) -> List[Tuple[List[str], str]]:
+        """
+        Consume a text delta
+        
+        Args:
+            delta: Next piece of model output
+            
+        Returns:
+            List of (expressions, clean_text) for sentences completed by it
+        """
+        chunks = []
+        for ch in delta:
+            tag = self._tag
+            if tag is not None:
+                if ch == "*":
+                    self._close_tag()
+                    continue
+                if ch != "\n":
+                    tag.append(ch)
+                    continue
+                # Tags never span lines: keep the '*' and text as plain text
+                self._abort_tag()
+            
+            if ch == "*":
+                self._tag = []
+                self._after_punct = False
+            elif ch == "\n" or (self._after_punct and ch.isspace()):
+                self._end_sentence(chunks)
+            else:
+                self._text.append(ch)
+                self._after_punct = ch in self._SENTENCE_PUNCT
+        return chunks
+    
+    def flush(self) -> Optional[Tuple[List[str], str]]:
+        """
+        Finish the stream and return the trailing partial sentence
+        
+        Returns:
+            (expressions, clean_text) or None if nothing is left
+        """
+        if self._tag is not None:
+            self._abort_tag()
+        chunks = []
+        self._end_sentence(chunks)
+        return chunks[0] if chunks else None
+    
+    def _close_tag(self):
+        """Record the open tag as an expression if it is supported"""
+        expr = "".join(self._tag).lower().strip()
+        if expr in self.supported:
+            self._expressions.append(expr)
+        self._tag = None
+    
+    def _abort_tag(self):
+        """Turn an unterminated tag back into plain text"""
+        self._text.append("*")
+        self._text.extend(self._tag)
+        self._tag = None
+    
+    def _end_sentence(self, chunks: List[Tuple[List[str], str]]):
+        """Emit the current sentence (if not empty) and reset state"""
+        clean_text = " ".join("".join(self._text).split())
+        if clean_text or self._expressions:
+            chunks.append((self._expressions, clean_text))
+            self._expressions = []
+        self._text = []
+        self._after_punct = False
+
+
 # Example usage and testing
 if __name__ == "__main__":
     parser = ExpressionParser()
@@ -4,22 +4,95 @@ Handles text and speech input processing
 """
 
 from typing import Optional, Tuple
+import functools
+import os
 import tempfile
 from pathlib import Path
 import io
 
+# Optional in-memory audio decoding – falls back to a temp file when missing
+try:
+    import soundfile as sf
+    _SOUNDFILE_AVAILABLE = True
+except ImportError:
+    sf = None
+    _SOUNDFILE_AVAILABLE = False
+
+# Sample rate expected by Whisper for raw sample input
+STT_SAMPLE_RATE = 16000
+
+# Prefer tmpfs for temporary audio files so they never touch the disk
+_TEMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# Maximum length of cleaned text input
+MAX_TEXT_LENGTH = 1000
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize_text(text: str, max_length: int = MAX_TEXT_LENGTH) -> str:
+    """
+    Clean and validate raw text input (memoized)
+    
+    Repeated inputs (short voice replies, retries, UI echoes) hit the cache.
+    Invalid inputs raise and are never cached.
+    
+    Args:
+        text: Raw text input from user
+        max_length: Maximum length of the cleaned text
+        
+    Returns:
+        Cleaned text
+        
+    Raises:
+        ValueError: If text is empty or too long
+    """
+    # Collapse whitespace in one pass (split() also trims both ends)
+    parts = text.split()
+    
+    # Basic validation
+    if not parts:
+        raise ValueError("Empty text input")
+    
+    text = " ".join(parts)
+    if len(text) > max_length:
+        raise ValueError(f"Text too long (max {max_length} characters)")
+    
+    return text
+
 
 class InputProcessor:
     """Process text and speech inputs"""
     
-    def __init__(self, stt_engine=None):
+    def __init__(self, stt_engine=None, beam_size: int = 1,
+                 vad_filter: bool = True, max_audio_mb: float = 10.0,
+                 max_text_length: int = MAX_TEXT_LENGTH,
+                 condition_on_previous_text: bool = True,
+                 max_raw_text_length: Optional[int] = None):
         """
         Initialize input processor
         
         Args:
             stt_engine: Speech-to-text engine instance (optional)
+            beam_size: STT beam width (1 = greedy, fastest)
+            vad_filter: Let the STT engine skip silence using VAD
+            max_audio_mb: Default maximum audio upload size in MB
+            max_text_length: Maximum length of cleaned text input
+            condition_on_previous_text: Let the STT engine use earlier
+                segments as context (keep on for dictation)
+            max_raw_text_length: Reject raw text longer than this before
+                cleaning it, as a guard against oversized payloads (None
+                disables it; max_text_length applies to the cleaned text)
         """
         self.stt_engine = stt_engine
+        self.stt_options = {
+            "beam_size": beam_size,
+            "vad_filter": vad_filter,
+            "condition_on_previous_text": condition_on_previous_text
+        }
+        self.max_audio_mb = max_audio_mb
+        self._max_audio_bytes = int(max_audio_mb * 1024 * 1024)
+        self.max_text_length = max_text_length
+        self.max_raw_text_length = max_raw_text_length
     
     def process_text(self, text: str) -> str:
         """
@@ -31,20 +104,16 @@ class InputProcessor:
         Returns:
             Cleaned and processed text
         """
-        # Basic text cleaning
-        text = text.strip()
-        
-        # Remove excessive whitespace
-        text = " ".join(text.split())
-        
-        # Basic validation
         if not text:
             raise ValueError("Empty text input")
-        
-        if len(text) > 1000:
-            raise ValueError("Text too long (max 1000 characters)")
-        
-        return text
+        # Optional guard so huge payloads are never split or cached
+        if (self.max_raw_text_length is not None
+                and len(text) > self.max_raw_text_length):
+            raise ValueError(
+                f"Input too large (max {self.max_raw_text_length} "
+                f"characters before cleanup)"
+            )
+        return _normalize_text(text, self.max_text_length)
     
     def process_speech(self, audio_data: bytes, 
                       filename: Optional[str] = None) -> str:
@@ -64,6 +133,45 @@ class InputProcessor:
         if self.stt_engine is None:
             raise ValueError("STT engine not configured")
         
+        try:
+            # Transcribe audio
+            text = self._transcribe(audio_data, filename)
+            
+            if not text or not text.strip():
+                raise ValueError("No speech detected in audio")
+            
+            return text.strip()
+            
+        except Exception as e:
+            raise ValueError(f"Speech transcription failed: {str(e)}")
+    
+    def _transcribe(self, audio_data: bytes, filename: Optional[str]) -> str:
+        """
+        Run the STT engine, avoiding a disk round-trip where possible
+        
+        If the engine accepts raw samples and the audio decodes in memory to
+        16 kHz, samples are passed directly. Otherwise the audio is written
+        to a temporary file (on tmpfs when available).
+        
+        Args:
+            audio_data: Audio file data (bytes)
+            filename: Original filename for format detection
+            
+        Returns:
+            Transcribed text
+        """
+        if _SOUNDFILE_AVAILABLE and hasattr(self.stt_engine, "transcribe_array"):
+            try:
+                samples, sample_rate = sf.read(io.BytesIO(audio_data), dtype="float32")
+            except Exception:
+                # Format not supported by libsndfile – use the file path
+                samples, sample_rate = None, None
+            
+            if samples is not None and sample_rate == STT_SAMPLE_RATE:
+                return self.stt_engine.transcribe_array(
+                    samples, sample_rate, **self.stt_options
+                )
+        
         # Detect audio format from filename
         audio_format = "wav"  # default
         if filename:
@@ -74,37 +182,25 @@ class InputProcessor:
         # Save to temporary file
         with tempfile.NamedTemporaryFile(
             suffix=f".{audio_format}", 
+            dir=_TEMP_DIR,
             delete=False
         ) as tmp_file:
             tmp_file.write(audio_data)
             tmp_path = tmp_file.name
         
         try:
-            # Transcribe audio
-            text = self.stt_engine.transcribe(tmp_path)
-            
-            # Clean up temp file
-            Path(tmp_path).unlink()
-            
-            if not text or not text.strip():
-                raise ValueError("No speech detected in audio")
-            
-            return text.strip()
-            
-        except Exception as e:
-            # Clean up temp file on error
-            if Path(tmp_path).exists():
-                Path(tmp_path).unlink()
-            raise ValueError(f"Speech transcription failed: {str(e)}")
+            return self.stt_engine.transcribe(tmp_path, **self.stt_options)
+        finally:
+            Path(tmp_path).unlink(missing_ok=True)
     
     def validate_audio(self, audio_data: bytes, 
-                      max_size_mb: float = 10.0) -> bool:
+                      max_size_mb: Optional[float] = None) -> bool:
         """
         Validate audio file
         
         Args:
             audio_data: Audio file data
-            max_size_mb: Maximum file size in MB
+            max_size_mb: Maximum file size in MB (default: max_audio_mb)
             
         Returns:
             True if valid
@@ -112,14 +208,21 @@ class InputProcessor:
         Raises:
             ValueError: If audio is invalid
         """
-        size_mb = len(audio_data) / (1024 * 1024)
+        # Size gate first: len() is O(1) and touches none of the data
+        size = len(audio_data)
+        if max_size_mb is None:
+            max_size_mb = self.max_audio_mb
+            max_bytes = self._max_audio_bytes
+        else:
+            max_bytes = int(max_size_mb * 1024 * 1024)
         
-        if size_mb > max_size_mb:
+        if size > max_bytes:
             raise ValueError(
-                f"Audio file too large: {size_mb:.1f}MB (max: {max_size_mb}MB)"
+                f"Audio file too large: {size / (1024 * 1024):.1f}MB "
+                f"(max: {max_size_mb}MB)"
             )
         
-        if len(audio_data) < 100:
+        if size < 100:
             raise ValueError("Audio file too small or corrupted")
         
         return True
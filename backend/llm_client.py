@@ -3,10 +3,30 @@ LLM Client for Lucy AI Companion
 Connects to llama.cpp server for inference
 """
 
+import time
+import zlib
+import httpx
 import requests
-from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, List, Dict, Optional
 from dataclasses import dataclass
 
+# Optional fast JSON codec – falls back to the stdlib when not installed
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _loads = json.loads
+
 
 @dataclass
 class LLMConfig:
@@ -17,11 +37,22 @@ class LLMConfig:
     max_tokens: int = 200
     repeat_penalty: float = 1.1
     timeout: int = 30
+    # Let llama.cpp reuse the KV cache for the prompt prefix shared with
+    # the previous turn, so only the new tokens are prefilled
+    cache_prompt: bool = True
+    # Number of server slots (llama.cpp --parallel); each user is pinned to
+    # one so their cached prefix stays in place between turns
+    slots: int = 1
+    # Keep-alive connections kept open to the server by each HTTP client
+    pool_size: int = 32
 
 
 class LLMClient:
     """Client for interacting with llama.cpp server"""
     
+    # Seconds a health check result is reused
+    HEALTH_CACHE_TTL = 1.0
+    
     def __init__(self, config: Optional[LLMConfig] = None):
         """
         Initialize LLM client
@@ -30,50 +61,139 @@ class LLMClient:
             config: LLM configuration (uses defaults if None)
         """
         self.config = config or LLMConfig()
+        self._base_url = self._derive_base_url(self.config.url)
+        
+        # Last health probe as (monotonic timestamp, result)
+        self._health_cache = (float("-inf"), False)
+        
+        # Reuse keep-alive connections to llama.cpp instead of opening a new
+        # socket per request. Retries stay disabled so a timeout surfaces
+        # immediately rather than being silently repeated.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.config.pool_size,
+            max_retries=0
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        
+        # Async client for FastAPI handlers so an LLM round-trip does not
+        # block the event loop. Its keep-alive pool matches the session;
+        # total connections stay uncapped so a burst never waits on the pool.
+        self._aclient = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=self.config.pool_size
+            )
+        )
     
-    def generate(self, messages: List[Dict], 
-                 temperature: Optional[float] = None,
-                 max_tokens: Optional[int] = None) -> str:
+    @staticmethod
+    def _derive_base_url(url: str) -> str:
+        """Strip the endpoint path from the completions URL"""
+        return url.rsplit('/', 2)[0]
+    
+    def slot_for(self, user_id: str) -> int:
         """
-        Generate completion from llama.cpp server
+        Get the llama.cpp slot a user's requests are pinned to
+        
+        Uses crc32 rather than hash() so the mapping is stable across
+        restarts and worker processes.
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            Slot index in [0, config.slots)
+        """
+        return zlib.crc32(user_id.encode("utf-8")) % self.config.slots
+    
+    def _build_payload(self, messages: List[Dict],
+                       temperature: Optional[float],
+                       max_tokens: Optional[int],
+                       slot_id: Optional[int] = None) -> Dict:
+        """
+        Build the llama.cpp request payload
         
         Args:
             messages: List of message dicts with role and content
             temperature: Override default temperature
             max_tokens: Override default max_tokens
+            slot_id: Server slot to run on (None lets the server choose)
             
         Returns:
-            Generated text response
-            
-        Raises:
-            ConnectionError: If server is unreachable
-            ValueError: If server returns error
+            JSON-serialisable payload dict
         """
         # Use overrides or defaults
         temp = temperature if temperature is not None else self.config.temperature
         max_tok = max_tokens if max_tokens is not None else self.config.max_tokens
         
-        # Prepare payload
         payload = {
             "messages": messages,
             "temperature": temp,
             "top_p": self.config.top_p,
             "max_tokens": max_tok,
             "repeat_penalty": self.config.repeat_penalty,
+            "cache_prompt": self.config.cache_prompt,
             "stream": False
         }
+        if slot_id is not None:
+            payload["id_slot"] = slot_id
+        return payload
+    
+    @staticmethod
+    def _extract_content(body: bytes) -> str:
+        """
+        Extract the assistant message from a llama.cpp response body
         
+        Args:
+            body: Raw JSON response body
+            
+        Returns:
+            Generated text response
+            
+        Raises:
+            ValueError: If the response is not in the expected format
+        """
         try:
-            response = requests.post(
+            result = _loads(body)
+            return result["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid response format from LLM server: {e}")
+    
+    def generate(self, messages: List[Dict], 
+                 temperature: Optional[float] = None,
+                 max_tokens: Optional[int] = None,
+                 slot_id: Optional[int] = None) -> str:
+        """
+        Generate completion from llama.cpp server
+        
+        Args:
+            messages: List of message dicts with role and content
+            temperature: Override default temperature
+            max_tokens: Override default max_tokens
+            slot_id: Server slot to run on (see slot_for)
+            
+        Returns:
+            Generated text response
+            
+        Raises:
+            ConnectionError: If server is unreachable
+            ValueError: If server returns error
+        """
+        payload = self._build_payload(
+            messages, temperature, max_tokens, slot_id
+        )
+        
+        try:
+            response = self._session.post(
                 self.config.url,
-                json=payload,
+                data=_dumps(payload),
+                headers={"Content-Type": "application/json"},
                 timeout=self.config.timeout
             )
             response.raise_for_status()
             
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-            
         except requests.exceptions.Timeout:
             raise ConnectionError(
                 f"LLM server timeout after {self.config.timeout}s"
@@ -84,8 +204,145 @@ class LLMClient:
             )
         except requests.exceptions.HTTPError as e:
             raise ValueError(f"LLM server error: {e.response.text}")
-        except (KeyError, IndexError) as e:
-            raise ValueError(f"Invalid response format from LLM server: {e}")
+        
+        return self._extract_content(response.content)
+    
+    async def agenerate(self, messages: List[Dict],
+                        temperature: Optional[float] = None,
+                        max_tokens: Optional[int] = None,
+                        slot_id: Optional[int] = None) -> str:
+        """
+        Generate completion from llama.cpp server without blocking the event loop
+        
+        Args:
+            messages: List of message dicts with role and content
+            temperature: Override default temperature
+            max_tokens: Override default max_tokens
+            slot_id: Server slot to run on (see slot_for)
+            
+        Returns:
+            Generated text response
+            
+        Raises:
+            ConnectionError: If server is unreachable
+            ValueError: If server returns error
+        """
+        payload = self._build_payload(
+            messages, temperature, max_tokens, slot_id
+        )
+        
+        try:
+            response = await self._aclient.post(
+                self.config.url,
+                content=_dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=self.config.timeout
+            )
+            response.raise_for_status()
+            
+        except httpx.TimeoutException:
+            raise ConnectionError(
+                f"LLM server timeout after {self.config.timeout}s"
+            )
+        except httpx.TransportError:
+            raise ConnectionError(
+                f"Cannot connect to LLM server at {self.config.url}"
+            )
+        except httpx.HTTPStatusError as e:
+            raise ValueError(f"LLM server error: {e.response.text}")
+        
+        return self._extract_content(response.content)
+    
+    async def aprefill(self, messages: List[Dict],
+                       slot_id: Optional[int] = None) -> None:
+        """
+        Evaluate a prompt into the server's KV cache without generating
+        
+        Best effort: a later request on the same slot that starts with
+        these messages only prefills what follows them. Failures are
+        ignored since the real request will simply prefill from scratch.
+        
+        Args:
+            messages: List of message dicts with role and content
+            slot_id: Server slot to warm (see slot_for)
+        """
+        # llama.cpp evaluates the prompt into the cache when n_predict is 0
+        payload = self._build_payload(messages, None, 0, slot_id)
+        
+        try:
+            await self._aclient.post(
+                self.config.url,
+                content=_dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=self.config.timeout
+            )
+        except httpx.HTTPError:
+            pass
+    
+    async def agenerate_stream(self, messages: List[Dict],
+                               temperature: Optional[float] = None,
+                               max_tokens: Optional[int] = None,
+                               slot_id: Optional[int] = None
+                               ) -> AsyncIterator[str]:
+        """
+        Stream a completion from llama.cpp server token by token
+        
+        Args:
+            messages: List of message dicts with role and content
+            temperature: Override default temperature
+            max_tokens: Override default max_tokens
+            slot_id: Server slot to run on (see slot_for)
+            
+        Yields:
+            Content deltas as they arrive from the server
+            
+        Raises:
+            ConnectionError: If server is unreachable
+            ValueError: If server returns error
+        """
+        payload = self._build_payload(
+            messages, temperature, max_tokens, slot_id
+        )
+        payload["stream"] = True
+        
+        try:
+            async with self._aclient.stream(
+                "POST",
+                self.config.url,
+                content=_dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=self.config.timeout
+            ) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise ValueError(f"LLM server error: {response.text}")
+                
+                # Server-sent events: one "data: {...}" line per delta
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    
+                    try:
+                        chunk = _loads(data)
+                        delta = chunk["choices"][0].get("delta", {}).get("content")
+                    except (KeyError, IndexError, TypeError, ValueError) as e:
+                        raise ValueError(
+                            f"Invalid response format from LLM server: {e}"
+                        )
+                    if delta:
+                        yield delta
+                        
+        except httpx.TimeoutException:
+            raise ConnectionError(
+                f"LLM server timeout after {self.config.timeout}s"
+            )
+        except httpx.TransportError:
+            raise ConnectionError(
+                f"Cannot connect to LLM server at {self.config.url}"
+            )
     
     def check_health(self) -> bool:
         """
@@ -94,16 +351,24 @@ class LLMClient:
         Returns:
             True if server is reachable and healthy
         """
+        # Reuse a recent result so frequent probes don't hit the server
+        now = time.monotonic()
+        checked_at, healthy = self._health_cache
+        if now - checked_at < self.HEALTH_CACHE_TTL:
+            return healthy
+        
         try:
             # Try to reach health endpoint
-            base_url = self.config.url.rsplit('/', 2)[0]  # Get base URL
-            response = requests.get(
-                f"{base_url}/health",
+            response = self._session.get(
+                f"{self._base_url}/health",
                 timeout=5
             )
-            return response.status_code == 200
+            healthy = response.status_code == 200
         except:
-            return False
+            healthy = False
+        
+        self._health_cache = (now, healthy)
+        return healthy
     
     def get_model_info(self) -> Optional[Dict]:
         """
@@ -113,9 +378,8 @@ class LLMClient:
             Model info dict or None if unavailable
         """
         try:
-            base_url = self.config.url.rsplit('/', 2)[0]
-            response = requests.get(
-                f"{base_url}/v1/models",
+            response = self._session.get(
+                f"{self._base_url}/v1/models",
                 timeout=5
             )
             if response.status_code == 200:
@@ -134,6 +398,18 @@ class LLMClient:
         for key, value in kwargs.items():
             if hasattr(self.config, key):
                 setattr(self.config, key, value)
+        
+        if "url" in kwargs:
+            self._base_url = self._derive_base_url(self.config.url)
+            self._health_cache = (float("-inf"), False)
+    
+    def close(self):
+        """Close pooled connections to the LLM server"""
+        self._session.close()
+    
+    async def aclose(self):
+        """Close pooled connections of the async client"""
+        await self._aclient.aclose()
 
 
 # Example usage
@@ -3,32 +3,59 @@ Lucy AI Virtual Companion - FastAPI Backend
 Handles LLM inference, STT, TTS, and expression parsing
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, File, Header, UploadFile, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 import uvicorn
+import aiofiles
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
 from pathlib import Path
-from typing import List, Optional
-import traceback
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional
 
 # Import modular components
 from config import (
-    LLAMA_CPP_URL, MAX_CONVERSATION_HISTORY, SYSTEM_PROMPT,
-    AUDIO_OUTPUT_DIR, WHISPER_MODEL_SIZE, WHISPER_DEVICE,
-    WHISPER_COMPUTE_TYPE, TTS_ENGINE, TTS_VOICE,
+    LLAMA_CPP_URL, LLAMA_CPP_SLOTS, MAX_CONVERSATION_HISTORY, REDIS_URL, SYSTEM_MESSAGE,
+    MAX_RAW_TEXT_LENGTH,
+    AUDIO_OUTPUT_DIR, AUDIO_CACHE_MAX_MB, AUDIO_CACHE_MAX_AGE_HOURS,
+    AUDIO_CLEANUP_INTERVAL, WHISPER_MODEL_SIZE, WHISPER_DEVICE,
+    WHISPER_COMPUTE_TYPE, WHISPER_NUM_WORKERS, WHISPER_CPU_THREADS,
+    WAKE_WHISPER_MODEL_SIZE, API_HOST, API_PORT, API_WORKERS,
+    TTS_ENGINE, TTS_VOICE, TTS_AUDIO_FORMAT, TTS_PIPER_PERSISTENT,
     RAG_ENABLED, RAG_MAX_RESULTS, RAG_SNIPPET_MAX_CHARS,
     WAKE_WORDS
 )
+
+# Several workers: hand over to the uvicorn CLI before any model is loaded,
+# so the supervisor stays light and only the workers (which import main
+# themselves) load Whisper, Piper and RAG
+if __name__ == "__main__" and API_WORKERS > 1:
+    if not REDIS_URL:
+        print("Warning: API_WORKERS > 1 without REDIS_URL - each worker keeps its own conversation history")
+    os.execv(sys.executable, [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--app-dir", str(Path(__file__).resolve().parent),
+        "--host", API_HOST,
+        "--port", str(API_PORT),
+        "--workers", str(API_WORKERS)
+    ])
+
 from llm_client import LLMClient, LLMConfig
-from conversation_manager import ConversationManager
-from expression_parser import ExpressionParser
+from conversation_manager import ConversationManager, RedisConversationManager
+from expression_parser import ExpressionParser, StreamingExpressionParser
 from input_processor import InputProcessor
 from tts_handler import TTSHandler
 from rag_web_search import WebRAG
 from wake_word import WakeWordDetector
 
+logger = logging.getLogger("lucy")
+
 # Optional imports for STT/TTS
 try:
     from stt_whisper import WhisperSTT
@@ -44,11 +71,25 @@ except ImportError:
     TTS_AVAILABLE = False
     print("Warning: TTS engine not available. Audio responses will be disabled.")
 
+# Optional fast JSON encoding for responses and stream events
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+
+    def _json_bytes(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    DefaultResponse = JSONResponse
+
+    def _json_bytes(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Lucy AI Companion API",
     description="Real-time virtual companion with emotion-aware responses",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=DefaultResponse
 )
 
 # CORS middleware for Unity integration
@@ -60,13 +101,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files for audio serving
+# Directory for synthesized audio (served by the /audio route below)
 AUDIO_OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
-app.mount("/audio", StaticFiles(directory=str(AUDIO_OUTPUT_DIR)), name="audio")
 
 # Initialize components
-llm_client = LLMClient(LLMConfig(url=LLAMA_CPP_URL))
-conversation_manager = ConversationManager(max_history=MAX_CONVERSATION_HISTORY)
+llm_client = LLMClient(LLMConfig(url=LLAMA_CPP_URL, slots=LLAMA_CPP_SLOTS))
+if REDIS_URL:
+    conversation_manager = RedisConversationManager(
+        REDIS_URL, max_history=MAX_CONVERSATION_HISTORY
+    )
+    print("✓ Conversation history stored in Redis")
+else:
+    conversation_manager = ConversationManager(max_history=MAX_CONVERSATION_HISTORY)
 expression_parser = ExpressionParser()
 
 # Initialize RAG
@@ -83,24 +129,54 @@ if WHISPER_AVAILABLE:
         stt_engine = WhisperSTT(
             model_size=WHISPER_MODEL_SIZE,
             device=WHISPER_DEVICE,
-            compute_type=WHISPER_COMPUTE_TYPE
+            compute_type=WHISPER_COMPUTE_TYPE,
+            num_workers=WHISPER_NUM_WORKERS,
+            cpu_threads=WHISPER_CPU_THREADS
         )
         print(f"✓ Whisper STT initialized ({WHISPER_MODEL_SIZE})")
     except Exception as e:
         print(f"Warning: Could not initialize Whisper: {e}")
 
-input_processor = InputProcessor(stt_engine=stt_engine)
+input_processor = InputProcessor(
+    stt_engine=stt_engine, max_raw_text_length=MAX_RAW_TEXT_LENGTH
+)
+
+# Wake word spotting only needs a short phrase, so it gets its own small
+# model (shared with the main engine when the sizes match)
+wake_stt = stt_engine
+if stt_engine is not None and WAKE_WHISPER_MODEL_SIZE != WHISPER_MODEL_SIZE:
+    try:
+        wake_stt = WhisperSTT(
+            model_size=WAKE_WHISPER_MODEL_SIZE,
+            device=WHISPER_DEVICE,
+            compute_type=WHISPER_COMPUTE_TYPE
+        )
+        print(f"✓ Wake word STT initialized ({WAKE_WHISPER_MODEL_SIZE})")
+    except Exception as e:
+        print(f"Warning: Could not initialize wake word Whisper model: {e}")
+
+# Wake clips: greedy decoding and no VAD, speed over accuracy
+wake_input_processor = InputProcessor(
+    stt_engine=wake_stt, beam_size=1, vad_filter=False,
+    condition_on_previous_text=False
+)
 
 # Initialize wake word detector
-wake_word_detector = WakeWordDetector(wake_words=WAKE_WORDS, stt_engine=stt_engine)
+wake_word_detector = WakeWordDetector(wake_words=WAKE_WORDS, stt_engine=wake_stt)
 print(f"✓ Wake word detector initialized ({wake_word_detector.get_wake_words()})")
 
 # Initialize TTS if available
 tts_handler = None
 if TTS_AVAILABLE:
     try:
-        tts_engine = TTSEngine(engine=TTS_ENGINE, voice=TTS_VOICE)
-        tts_handler = TTSHandler(tts_engine, output_dir=str(AUDIO_OUTPUT_DIR))
+        tts_engine = TTSEngine(
+            engine=TTS_ENGINE, voice=TTS_VOICE, persistent=TTS_PIPER_PERSISTENT
+        )
+        tts_handler = TTSHandler(
+            tts_engine,
+            output_dir=str(AUDIO_OUTPUT_DIR),
+            audio_format=TTS_AUDIO_FORMAT
+        )
         print(f"✓ TTS initialized ({TTS_ENGINE})")
     except Exception as e:
         print(f"Warning: Could not initialize TTS: {e}")
@@ -126,6 +202,40 @@ class ConversationResponse(BaseModel):
     raw_response: str
 
 
+async def _audio_cleanup_loop():
+    """Periodically evict stale and least recently used TTS audio files"""
+    while True:
+        try:
+            await asyncio.to_thread(
+                tts_handler.cleanup_old_files, AUDIO_CACHE_MAX_AGE_HOURS
+            )
+            await asyncio.to_thread(
+                tts_handler.enforce_size_limit, AUDIO_CACHE_MAX_MB * 1024 * 1024
+            )
+        except Exception as e:
+            print(f"Audio cleanup warning: {e}")
+        await asyncio.sleep(AUDIO_CLEANUP_INTERVAL)
+
+
+@app.on_event("startup")
+async def startup():
+    """Start background maintenance tasks"""
+    app.state.audio_cleanup = (
+        asyncio.create_task(_audio_cleanup_loop()) if tts_handler else None
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background tasks, release LLM connections and stop TTS processes"""
+    if app.state.audio_cleanup:
+        app.state.audio_cleanup.cancel()
+    await llm_client.aclose()
+    llm_client.close()
+    if tts_handler:
+        tts_handler.close()
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -146,7 +256,7 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Check if all services are running"""
-    llm_healthy = llm_client.check_health()
+    llm_healthy = await asyncio.to_thread(llm_client.check_health)
 
     return {
         "api": "online",
@@ -157,6 +267,101 @@ async def health_check():
     }
 
 
+async def _store_call(method, *args):
+    """
+    Call a conversation_manager method without blocking the event loop
+
+    The in-memory store is called directly; stores that do network I/O
+    (Redis) are called from a worker thread.
+    """
+    if conversation_manager.blocking_io:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+async def _build_messages(user_id: str, user_message: str) -> List[dict]:
+    """
+    Build the LLM message list, adding web search context if relevant
+
+    The system prompt and history always form the same prefix, so the
+    llama.cpp prompt cache stays valid. Web context is prepended to the new
+    user message rather than sent as a second system message, which many
+    chat templates reject (they want one leading system turn and strict
+    user/assistant alternation). While the search runs, the prefix is
+    prefilled on the user's slot so both network waits overlap.
+    """
+    async with conversation_manager.get_lock(user_id):
+        messages = await _store_call(
+            conversation_manager.format_for_llm,
+            user_id, SYSTEM_MESSAGE, user_message
+        )
+
+    # should_search is a cheap in-memory check; only the web search itself
+    # is moved off the event loop
+    if RAG_ENABLED and rag.is_available and rag.should_search(user_message):
+        web_context, _ = await asyncio.gather(
+            asyncio.to_thread(rag.augment_query, user_message),
+            llm_client.aprefill(messages[:-1], llm_client.slot_for(user_id))
+        )
+        if web_context:
+            # The final message is built per call, so it is safe to replace
+            messages[-1] = {
+                "role": "user",
+                "content": f"{web_context}\n\n{user_message}"
+            }
+
+    return messages
+
+
+async def _respond(user_id: str, user_message: str, temperature: float,
+                   max_tokens: int) -> ConversationResponse:
+    """
+    Generate Lucy's reply to an already-cleaned user message
+
+    Shared by the text and speech endpoints: queries the LLM, parses
+    expressions, updates history and optionally synthesizes audio.
+    """
+    # Build messages for LLM (with web search context when relevant)
+    messages = await _build_messages(user_id, user_message)
+    
+    # Query LLM
+    response = await llm_client.agenerate(
+        messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        slot_id=llm_client.slot_for(user_id)
+    )
+    
+    # Parse expressions and clean text
+    expressions, clean_text = expression_parser.parse(response)
+    
+    # Update conversation history (LLM call above runs outside the lock)
+    async with conversation_manager.get_lock(user_id):
+        await _store_call(
+            conversation_manager.add_exchange, user_id, user_message, response
+        )
+    
+    # Synthesize audio if TTS is available
+    audio_url = None
+    if tts_handler and clean_text:
+        try:
+            audio_path = await asyncio.wrap_future(
+                tts_handler.synthesize_async(clean_text, expressions)
+            )
+            # Convert to URL (assuming we're serving from /audio)
+            audio_url = f"/audio/{Path(audio_path).name}"
+        except Exception as e:
+            print(f"TTS warning: {e}")
+            # Continue without audio
+    
+    return ConversationResponse(
+        expressions=expressions,
+        text=clean_text,
+        audio_url=audio_url,
+        raw_response=response
+    )
+
+
 @app.post("/chat", response_model=ConversationResponse)
 async def chat(input_data: TextInput):
     """
@@ -166,63 +371,133 @@ async def chat(input_data: TextInput):
     and optionally synthesizes audio
     """
     try:
-        user_id = input_data.user_id
-
         # Process and validate input
         user_message = input_processor.process_text(input_data.message)
 
-        # Optionally augment system prompt with web search context
-        system_prompt = SYSTEM_PROMPT
-        if RAG_ENABLED and rag.is_available:
-            web_context = rag.augment_query(user_message)
-            if web_context:
-                system_prompt = f"{SYSTEM_PROMPT}\n\n{web_context}"
-
-        # Build messages for LLM
-        messages = conversation_manager.format_for_llm(
-            user_id, system_prompt, user_message
-        )
-        
-        # Query LLM
-        response = llm_client.generate(
-            messages,
-            temperature=input_data.temperature,
-            max_tokens=input_data.max_tokens
+        return await _respond(
+            input_data.user_id,
+            user_message,
+            input_data.temperature,
+            input_data.max_tokens
         )
         
-        # Parse expressions and clean text
-        expressions, clean_text = expression_parser.parse(response)
-        
-        # Update conversation history
-        conversation_manager.add_message(user_id, "user", user_message)
-        conversation_manager.add_message(user_id, "assistant", response)
-        
-        # Synthesize audio if TTS is available
-        audio_url = None
-        if tts_handler and clean_text:
-            try:
-                audio_path = tts_handler.synthesize(clean_text, expressions)
-                # Convert to URL (assuming we're serving from /audio)
-                audio_url = f"/audio/{Path(audio_path).name}"
-            except Exception as e:
-                print(f"TTS warning: {e}")
-                # Continue without audio
-        
-        return ConversationResponse(
-            expressions=expressions,
-            text=clean_text,
-            audio_url=audio_url,
-            raw_response=response
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.exception("Chat error")
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+
+def _sse(payload: dict) -> bytes:
+    """Frame one JSON payload as a server-sent event"""
+    return b"data: " + _json_bytes(payload) + b"\n\n"
+
+
+async def _stream_chunk(expressions: List[str], clean_text: str) -> dict:
+    """Synthesize one parsed sentence and build its event payload"""
+    audio_url = None
+    if tts_handler and clean_text:
+        try:
+            audio_path = await asyncio.wrap_future(
+                tts_handler.synthesize_async(clean_text, expressions)
+            )
+            audio_url = f"/audio/{Path(audio_path).name}"
+        except Exception as e:
+            print(f"TTS warning: {e}")
+
+    return {
+        "expressions": expressions,
+        "text": clean_text,
+        "audio_url": audio_url
+    }
+
+
+async def _chat_stream_events(user_id: str, user_message: str,
+                              messages: List[dict], temperature: float,
+                              max_tokens: int) -> AsyncIterator[bytes]:
+    """
+    Stream the LLM reply as server-sent events, one per sentence
+
+    Deltas go through a single-pass streaming parser; each sentence it
+    completes is handed to a background task for TTS while the LLM keeps
+    decoding, so synthesis never stalls the token stream. Events are still
+    emitted in sentence order. The final event carries the full raw
+    response.
+    """
+    raw_parts = []
+    parser = StreamingExpressionParser()
+    pending: Deque[asyncio.Task] = deque()
+    try:
+        try:
+            async for delta in llm_client.agenerate_stream(
+                messages, temperature=temperature, max_tokens=max_tokens,
+                slot_id=llm_client.slot_for(user_id)
+            ):
+                raw_parts.append(delta)
+                for expressions, clean_text in parser.feed(delta):
+                    pending.append(
+                        asyncio.create_task(_stream_chunk(expressions, clean_text))
+                    )
+
+                # Emit whatever is already synthesized, without waiting
+                while pending and pending[0].done():
+                    yield _sse(pending.popleft().result())
+
+            last = parser.flush()
+            if last:
+                pending.append(asyncio.create_task(_stream_chunk(*last)))
+        except (ConnectionError, ValueError) as e:
+            yield _sse({"error": str(e)})
+            return
+
+        while pending:
+            yield _sse(await pending.popleft())
+    finally:
+        # Client went away or the LLM failed: drop unsent sentences
+        for task in pending:
+            task.cancel()
+
+    response = "".join(raw_parts)
+    async with conversation_manager.get_lock(user_id):
+        await _store_call(
+            conversation_manager.add_exchange, user_id, user_message, response
         )
-        
+
+    yield _sse({"done": True, "raw_response": response})
+
+
+@app.post("/chat/stream")
+async def chat_stream(input_data: TextInput):
+    """
+    Streaming chat endpoint - handles text input
+
+    Returns server-sent events: one {expressions, text, audio_url} event
+    per sentence as soon as it is generated, followed by a final
+    {done, raw_response} event. Clients that cannot consume a stream
+    should use /chat instead.
+    """
+    try:
+        user_message = input_processor.process_text(input_data.message)
+        messages = await _build_messages(input_data.user_id, user_message)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except ConnectionError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        print(f"Chat error: {traceback.format_exc()}")
+        logger.exception("Chat stream error")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+    return StreamingResponse(
+        _chat_stream_events(
+            input_data.user_id, user_message, messages,
+            input_data.temperature, input_data.max_tokens
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 
 @app.post("/speech", response_model=ConversationResponse)
 async def speech(
@@ -250,39 +525,127 @@ async def speech(
         input_processor.validate_audio(audio_data)
         
         # Transcribe speech to text
-        transcribed_text = input_processor.process_speech(
+        transcribed_text = await asyncio.to_thread(
+            input_processor.process_speech,
             audio_data,
             filename=audio.filename
         )
         
-        # Process as text input
-        input_data = TextInput(
-            user_id=user_id,
-            message=transcribed_text,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
-        
-        return await chat(input_data)
+        # Transcription is already cleaned, so skip text re-processing
+        return await _respond(user_id, transcribed_text, temperature, max_tokens)
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        print(f"Speech error: {traceback.format_exc()}")
+        logger.exception("Speech error")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
+# Media types for synthesized audio, by file suffix
+_AUDIO_MEDIA_TYPES = {".wav": "audio/wav", ".opus": "audio/ogg"}
+
+# Single byte range: "bytes=start-end", "bytes=start-" or "bytes=-suffix"
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+_AUDIO_CHUNK_SIZE = 64 * 1024
+
+
+async def _read_file_range(path: Path, start: int,
+                           length: int) -> AsyncIterator[bytes]:
+    """Yield length bytes of a file starting at start, in chunks"""
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(_AUDIO_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@app.get("/audio/{name}")
+async def get_audio(name: str,
+                    range_header: Optional[str] = Header(None, alias="Range")):
+    """
+    Serve a synthesized audio file
+
+    File names are content hashes, so a name always maps to the same audio
+    and clients may cache it. Serving takes a single stat(); a single byte
+    range is honoured so players can start on a partial download.
+    """
+    if "/" in name or "\\" in name or ".." in name:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    path = AUDIO_OUTPUT_DIR / name
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    media_type = _AUDIO_MEDIA_TYPES.get(path.suffix, "application/octet-stream")
+    headers = {
+        "Cache-Control": "public, max-age=86400, immutable",
+        "Accept-Ranges": "bytes"
+    }
+
+    # Malformed and multi-range headers are ignored and get the full file,
+    # as allowed; only a well-formed range past the end is a 416
+    match = _RANGE_RE.match(range_header.strip()) if range_header else None
+    if match:
+        first, last = match.groups()
+        if not (first or last) or (first and last and int(last) < int(first)):
+            match = None
+
+    if match:
+        size = stat_result.st_size
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the final N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+
+        if start >= size:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+
+        length = end - start + 1
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(length)
+        return StreamingResponse(
+            _read_file_range(path, start, length),
+            status_code=206,
+            media_type=media_type,
+            headers=headers
+        )
+
+    return FileResponse(
+        path,
+        stat_result=stat_result,
+        media_type=media_type,
+        headers=headers
+    )
+
+
 @app.delete("/conversation/{user_id}")
 async def clear_conversation(user_id: str):
     """Clear conversation history for a user"""
-    conversation_manager.clear_history(user_id)
+    async with conversation_manager.get_lock(user_id):
+        await _store_call(conversation_manager.clear_history, user_id)
     return {"message": f"Conversation history cleared for {user_id}"}
 
 
 @app.get("/conversation/{user_id}")
 async def get_conversation(user_id: str):
     """Get conversation history for a user"""
-    return conversation_manager.export_history(user_id)
+    return await _store_call(conversation_manager.export_history, user_id)
 
 
 class RAGSearchRequest(BaseModel):
@@ -308,7 +671,7 @@ async def rag_search(request: RAGSearchRequest):
         if not query:
             raise HTTPException(status_code=400, detail="Query must not be empty")
 
-        results = rag.search(query)
+        results = await asyncio.to_thread(rag.search, query)
         context = rag.format_context(results)
 
         return {
@@ -322,7 +685,7 @@ async def rag_search(request: RAGSearchRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"RAG search error: {traceback.format_exc()}")
+        logger.exception("RAG search error")
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
 
@@ -338,7 +701,7 @@ async def detect_wake_word(
     The Unity client polls this endpoint with short recorded chunks to
     enable hands-free voice activation.
     """
-    if not WHISPER_AVAILABLE or stt_engine is None:
+    if not WHISPER_AVAILABLE or wake_stt is None:
         raise HTTPException(
             status_code=503,
             detail="Wake word detection requires Whisper STT. Install faster-whisper."
@@ -346,9 +709,10 @@ async def detect_wake_word(
 
     try:
         audio_data = await audio.read()
-        input_processor.validate_audio(audio_data)
+        wake_input_processor.validate_audio(audio_data)
 
-        transcribed = input_processor.process_speech(
+        transcribed = await asyncio.to_thread(
+            wake_input_processor.process_speech,
             audio_data,
             filename=audio.filename
         )
@@ -370,9 +734,12 @@ async def detect_wake_word(
             "wake_words": wake_word_detector.get_wake_words()
         }
     except Exception as e:
-        print(f"Wake word error: {traceback.format_exc()}")
+        logger.exception("Wake word error")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    # Single worker: serve the already-loaded app (several workers were
+    # handed to the uvicorn CLI right after the config import)
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
\ No newline at end of file
@@ -4,7 +4,10 @@ Uses DuckDuckGo for free, no-API-key web search to augment LLM context
 """
 
 import re
-from typing import List, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
 # Optional dependency – RAG is silently disabled when not installed
@@ -16,9 +19,12 @@ except ImportError:
     _DDGS_AVAILABLE = False
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class WebSearchResult:
-    """Represents a single web search result"""
+    """Represents a single web search result
+
+    Immutable because cached result lists are shared between callers.
+    """
     title: str
     body: str
     href: str = ""
@@ -35,18 +41,31 @@ class WebRAG:
         "weather", "price", "score", "search", "find out",
     ]
 
-    def __init__(self, max_results: int = 3, snippet_max_chars: int = 300):
+    # All triggers compiled into one alternation so a query is scanned once
+    _TRIGGER_RE = re.compile("|".join(re.escape(t) for t in SEARCH_TRIGGERS))
+
+    def __init__(self, max_results: int = 3, snippet_max_chars: int = 300,
+                 cache_size: int = 256, cache_ttl: float = 300.0):
         """
         Initialize WebRAG
 
         Args:
             max_results: Maximum number of search results to retrieve
             snippet_max_chars: Maximum characters per result snippet
+            cache_size: Maximum number of cached queries (0 disables caching)
+            cache_ttl: Seconds a cached result stays valid
         """
         self.max_results = max_results
         self.snippet_max_chars = snippet_max_chars
         self._ddgs_available = _DDGS_AVAILABLE
 
+        # LRU of normalized query -> (monotonic expiry, results). Searches
+        # run in worker threads, so access is guarded by a lock.
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: OrderedDict[str, Tuple[float, List[WebSearchResult]]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
         if not self._ddgs_available:
             print("Warning: duckduckgo-search not installed. RAG web search will be unavailable.")
 
@@ -68,6 +87,11 @@ class WebRAG:
         if not self._ddgs_available or DDGS is None:
             return []
 
+        key = query.casefold().strip()
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
         try:
             results: List[WebSearchResult] = []
             with DDGS() as ddgs:
@@ -77,11 +101,38 @@ class WebRAG:
                         body=r.get("body", "")[:self.snippet_max_chars],
                         href=r.get("href", "")
                     ))
-            return results
         except Exception as e:
             print(f"Web search error: {e}")
             return []
 
+        # Only successful searches are cached so a network blip is retried
+        if results:
+            self._cache_put(key, results)
+        return results
+
+    def _cache_get(self, key: str) -> Optional[List[WebSearchResult]]:
+        """Return a copy of unexpired cached results for key, or None"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, results = entry
+            if time.monotonic() >= expires_at:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return list(results)
+
+    def _cache_put(self, key: str, results: List[WebSearchResult]):
+        """Store results for key, evicting the least recently used entry"""
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, list(results))
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
     def format_context(self, results: List[WebSearchResult]) -> str:
         """
         Format search results as a context block for the LLM
@@ -111,8 +162,7 @@ class WebRAG:
         Returns:
             True if web search would likely improve the response
         """
-        query_lower = query.lower()
-        return any(trigger in query_lower for trigger in self.SEARCH_TRIGGERS)
+        return self._TRIGGER_RE.search(query.casefold()) is not None
 
     def augment_query(self, query: str) -> Optional[str]:
         """
@@ -4,69 +4,183 @@ Optimized for real-time performance
 """
 
 from faster_whisper import WhisperModel
+import ctranslate2
 import numpy as np
-from pathlib import Path
-import tempfile
+from typing import Tuple
+
+# Sample rate Whisper models expect
+WHISPER_SAMPLE_RATE = 16000
+
+
+def resolve_device(device: str = "auto", compute_type: str = "auto") -> Tuple[str, str]:
+    """Resolve "auto" device/compute type settings
+    
+    "auto" picks CUDA when a GPU is visible to CTranslate2, and float16 on
+    GPU or int8 on CPU. Explicit values are returned unchanged.
+    
+    Args:
+        device: "auto", "cpu" or "cuda"
+        compute_type: "auto", "int8", "float16", "float32"
+    
+    Returns:
+        Tuple of (device, compute_type)
+    """
+    if device == "auto":
+        device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    if compute_type == "auto":
+        compute_type = "float16" if device == "cuda" else "int8"
+    return device, compute_type
+
+
+def resample(samples: np.ndarray, sample_rate: int,
+             target_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """Linearly resample mono float32 samples to target_rate
+    
+    Args:
+        samples: Mono audio samples
+        sample_rate: Sample rate of samples
+        target_rate: Desired sample rate
+    
+    Returns:
+        Resampled float32 samples (the input itself if the rates match)
+    """
+    if sample_rate == target_rate or len(samples) == 0:
+        return samples
+    duration = len(samples) / sample_rate
+    target_len = max(1, round(duration * target_rate))
+    positions = np.arange(target_len) * (sample_rate / target_rate)
+    return np.interp(
+        positions, np.arange(len(samples)), samples
+    ).astype(np.float32)
 
 
 class WhisperSTT:
-    def __init__(self, model_size: str = "small", device: str = "cpu", compute_type: str = "int8"):
+    def __init__(self, model_size: str = "small", device: str = "auto", compute_type: str = "auto",
+                 num_workers: int = 1, cpu_threads: int = 0, warmup: bool = True):
         """Initialize Whisper STT
         
         Args:
             model_size: "tiny", "base", "small", "medium", "large-v2"
-            device: "cpu" or "cuda"
-            compute_type: "int8", "float16", "float32"
+            device: "auto", "cpu" or "cuda"
+            compute_type: "auto", "int8", "float16", "float32"
+            num_workers: Model workers; transcribe calls from different
+                threads run in parallel up to this many
+            cpu_threads: Threads used by each worker on CPU (0 = default)
+            warmup: Decode one second of silence after loading so the first
+                real request doesn't pay for kernel selection and buffer setup
         """
-        print(f"Loading Whisper {model_size} model...")
-        self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
+        device, compute_type = resolve_device(device, compute_type)
+        print(f"Loading Whisper {model_size} model ({device}, {compute_type})...")
+        self.model = WhisperModel(
+            model_size, device=device, compute_type=compute_type,
+            num_workers=num_workers, cpu_threads=cpu_threads
+        )
+        if warmup:
+            self.warmup()
         print("Whisper model loaded!")
     
-    def transcribe(self, audio_path: str, language: str = "en") -> str:
-        """Transcribe audio file to text
+    def warmup(self):
+        """Run one second of silence through the model"""
+        silence = np.zeros(16000, dtype=np.float32)
+        segments, _ = self.model.transcribe(
+            silence, beam_size=1, vad_filter=False, language="en"
+        )
+        list(segments)  # Segments are lazy; consume them to run the decoder
+    
+    def _run(self, audio, language: str, beam_size: int, vad_filter: bool,
+             condition_on_previous_text: bool = True) -> str:
+        """Run the model and join the segment texts
         
         Args:
-            audio_path: Path to audio file
-            language: Language code (default: "en")
+            audio: Path to audio file or 16 kHz float32 samples
+            language: Language code
+            beam_size: Beam width (1 = greedy decoding)
+            vad_filter: Skip silent regions with voice activity detection
+            condition_on_previous_text: Feed each segment's text to the next
+                as context (off for short clips such as wake words)
         
         Returns:
             Transcribed text
         """
         segments, info = self.model.transcribe(
-            audio_path,
+            audio,
             language=language,
-            beam_size=5,
-            vad_filter=True,  # Voice activity detection
-            vad_parameters=dict(min_silence_duration_ms=500)
+            beam_size=beam_size,
+            # Greedy decoding also skips sampling candidates on fallback
+            best_of=1 if beam_size == 1 else 5,
+            vad_filter=vad_filter,  # Voice activity detection
+            condition_on_previous_text=condition_on_previous_text
         )
         
         # Combine all segments
-        text = " ".join([segment.text for segment in segments])
-        return text.strip()
+        return " ".join(segment.text.strip() for segment in segments).strip()
+    
+    def transcribe(self, audio_path: str, language: str = "en",
+                   beam_size: int = 5, vad_filter: bool = True,
+                   condition_on_previous_text: bool = True) -> str:
+        """Transcribe audio file to text
+        
+        Args:
+            audio_path: Path to audio file
+            language: Language code (default: "en")
+            beam_size: Beam width (1 = greedy decoding)
+            vad_filter: Only decode speech regions found by VAD
+            condition_on_previous_text: Use earlier segments as context
+        
+        Returns:
+            Transcribed text
+        """
+        return self._run(
+            audio_path, language, beam_size, vad_filter, condition_on_previous_text
+        )
+    
+    def transcribe_array(self, samples: np.ndarray, sample_rate: int = 16000,
+                         language: str = "en", beam_size: int = 5,
+                         vad_filter: bool = True,
+                         condition_on_previous_text: bool = True) -> str:
+        """Transcribe decoded audio samples without writing a file
+        
+        Args:
+            samples: Float32 audio samples in [-1, 1], mono or (frames, channels)
+            sample_rate: Sample rate of the samples (resampled to 16 kHz)
+            language: Language code (default: "en")
+            beam_size: Beam width (1 = greedy decoding)
+            vad_filter: Only decode speech regions found by VAD
+            condition_on_previous_text: Use earlier segments as context
+        
+        Returns:
+            Transcribed text
+        """
+        # Downmix to mono
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        
+        samples = resample(samples.astype(np.float32, copy=False), sample_rate)
+        return self._run(
+            samples, language, beam_size, vad_filter, condition_on_previous_text
+        )
     
     def transcribe_realtime(self, audio_data: np.ndarray, sample_rate: int = 16000) -> str:
         """Transcribe audio data in real-time
         
+        Samples are passed to the model directly, with no WAV file round trip.
+        
         Args:
-            audio_data: NumPy array of audio samples
-            sample_rate: Sample rate of audio
+            audio_data: NumPy array of audio samples (int16 PCM or float in [-1, 1])
+            sample_rate: Sample rate of audio (resampled to 16 kHz)
         
         Returns:
             Transcribed text
         """
-        # Save to temporary file (faster-whisper requires file input)
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-            import scipy.io.wavfile as wavfile
-            wavfile.write(tmp_file.name, sample_rate, audio_data)
-            result = self.transcribe(tmp_file.name)
-            Path(tmp_file.name).unlink()  # Clean up
+        if audio_data.dtype == np.int16:
+            audio_data = audio_data.astype(np.float32) / 32768.0
         
-        return result
+        return self.transcribe_array(audio_data, sample_rate)
 
 
 # Example usage
 if __name__ == "__main__":
-    stt = WhisperSTT(model_size="small", device="cpu")
+    stt = WhisperSTT(model_size="small")
     
     # Test with audio file
     # result = stt.transcribe("test_audio.wav")
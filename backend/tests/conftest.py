@@ -0,0 +1,62 @@
+"""
+Shared pytest fixtures for the Lucy backend tests
+
+Run the suite in parallel with:
+    pytest -n auto --dist=loadfile
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+API_BASE_URL = "http://localhost:8000"
+BACKEND_DIR = Path(__file__).parent.parent
+STARTUP_TIMEOUT = 120  # Seconds; model loading dominates startup
+
+
+def _backend_healthy() -> bool:
+    try:
+        return requests.get(f"{API_BASE_URL}/health", timeout=2).status_code == 200
+    except requests.RequestException:
+        return False
+
+
+@pytest.fixture(scope="session")
+def backend_server():
+    """
+    Make sure the backend is running for the integration tests
+
+    Reuses a server that is already up; otherwise (only reached with
+    LUCY_START_BACKEND=1, as test_integration.py skips itself when no
+    server is running) starts `python main.py` once for the whole session
+    and stops it afterwards. The integration tests all live in one file,
+    which --dist=loadfile keeps on one xdist worker, so only that worker
+    boots it.
+    """
+    if _backend_healthy():
+        yield API_BASE_URL
+        return
+
+    process = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.STDOUT
+    )
+    try:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while not _backend_healthy():
+            if process.poll() is not None or time.monotonic() > deadline:
+                pytest.fail(
+                    "Backend server did not start. "
+                    "Start it manually with: python main.py"
+                )
+            time.sleep(1)
+        yield API_BASE_URL
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
@@ -3,11 +3,6 @@ Unit tests for Conversation Manager
 """
 
 import unittest
-import sys
-from pathlib import Path
-
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from conversation_manager import ConversationManager
 
@@ -15,9 +10,14 @@ from conversation_manager import ConversationManager
 class TestConversationManager(unittest.TestCase):
     """Test cases for ConversationManager"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Create one manager shared by all tests"""
+        cls.manager = ConversationManager(max_history=3)
+    
     def setUp(self):
-        """Set up test manager"""
-        self.manager = ConversationManager(max_history=3)
+        """Reset the shared manager"""
+        self.manager.clear_all()
     
     def test_new_user_empty_history(self):
         """Test that new user has empty history"""
@@ -37,6 +37,18 @@ class TestConversationManager(unittest.TestCase):
         self.assertEqual(history[0]["content"], "Hello")
         self.assertEqual(history[1]["role"], "assistant")
     
+    def test_add_exchange(self):
+        """Test adding a user message and reply together"""
+        user_id = "test_user"
+        
+        self.manager.add_exchange(user_id, "Hello", "Hi there!")
+        
+        self.assertEqual(self.manager.get_history(user_id), [
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hi there!"}
+        ])
+        self.assertEqual(self.manager.get_metadata(user_id)["message_count"], 2)
+    
     def test_history_trimming(self):
         """Test that history is trimmed to max_history exchanges"""
         user_id = "test_user"
@@ -98,6 +110,31 @@ class TestConversationManager(unittest.TestCase):
         self.assertEqual(messages[-1]["role"], "user")
         self.assertEqual(messages[-1]["content"], "How are you?")
     
+    def test_format_for_llm_prebuilt_system_message(self):
+        """Test that a prebuilt system message dict is used as-is"""
+        system_message = {"role": "system", "content": "Be nice"}
+        messages = self.manager.format_for_llm(
+            "test_user", system_message, "Hi"
+        )
+        self.assertIs(messages[0], system_message)
+        self.assertEqual(len(messages), 2)
+    
+    def test_format_for_llm_reflects_new_messages(self):
+        """Test that the reused prefix is rebuilt when history changes"""
+        user_id = "test_user"
+        first = self.manager.format_for_llm(user_id, "Be nice", "Hi")
+        again = self.manager.format_for_llm(user_id, "Be nice", "Hey")
+        self.assertIs(first[0], again[0])
+        
+        self.manager.add_message(user_id, "user", "Hi")
+        messages = self.manager.format_for_llm(user_id, "Be nice", "Hey")
+        self.assertEqual(messages[1], {"role": "user", "content": "Hi"})
+        
+        self.manager.clear_history(user_id)
+        messages = self.manager.format_for_llm(user_id, "Be kind", "Hey")
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[0]["content"], "Be kind")
+    
     def test_exchange_count(self):
         """Test exchange counting"""
         user_id = "test_user"
@@ -153,6 +190,12 @@ class TestConversationManager(unittest.TestCase):
         self.assertEqual(len(history2), 1)
         self.assertEqual(history1[0]["content"], "Message 1")
         self.assertEqual(history2[0]["content"], "Message 2")
+    
+    def test_get_lock_stable_per_user(self):
+        """Test that a user always maps to the same lock stripe"""
+        lock = self.manager.get_lock("user1")
+        self.assertIs(self.manager.get_lock("user1"), lock)
+        self.assertIn(lock, self.manager._locks)
 
 
 if __name__ == "__main__":
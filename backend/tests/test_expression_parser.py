@@ -3,13 +3,10 @@ Unit tests for Expression Parser
 """
 
 import unittest
-import sys
-from pathlib import Path
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import pytest
 
-from expression_parser import ExpressionParser
+from expression_parser import ExpressionParser, StreamingExpressionParser
 
 
 class TestExpressionParser(unittest.TestCase):
@@ -67,6 +64,14 @@ class TestExpressionParser(unittest.TestCase):
         self.assertEqual(expressions, [])
         self.assertEqual(clean, "Just plain text")
     
+    def test_no_expressions_whitespace_normalized(self):
+        """Test the no-tag fast path still normalizes whitespace"""
+        text = "  Just \n plain\ttext  "
+        
+        self.assertEqual(self.parser.parse(text), ([], "Just plain text"))
+        self.assertEqual(self.parser.remove_expressions(text), "Just plain text")
+        self.assertEqual(self.parser.extract_expressions(text), [])
+    
     def test_whitespace_normalization(self):
         """Test that whitespace is normalized"""
         text = "*smile*\n\n  Hello   \n  there!  \n*giggle*"
@@ -103,15 +108,64 @@ class TestExpressionParser(unittest.TestCase):
         self.assertTrue(ExpressionParser.is_valid_expression("  blush  "))
         self.assertFalse(ExpressionParser.is_valid_expression("invalid"))
         self.assertFalse(ExpressionParser.is_valid_expression("notreal"))
+
+
+@pytest.mark.parametrize("expr", sorted(ExpressionParser.SUPPORTED_EXPRESSIONS))
+def test_supported_expression(expr):
+    """Test that every supported expression is recognized"""
+    expressions, _ = ExpressionParser().parse(f"*{expr}* text")
+    assert expr in expressions
+
+
+class TestStreamingExpressionParser(unittest.TestCase):
+    """Test cases for StreamingExpressionParser"""
     
-    def test_all_supported_expressions(self):
-        """Test that all supported expressions are recognized"""
-        supported = ExpressionParser.SUPPORTED_EXPRESSIONS
+    def _parse_in_chunks(self, text, size):
+        """Feed text in fixed-size deltas and collect all chunks"""
+        parser = StreamingExpressionParser()
+        chunks = []
+        for i in range(0, len(text), size):
+            chunks.extend(parser.feed(text[i:i + size]))
+        last = parser.flush()
+        if last:
+            chunks.append(last)
+        return chunks
+    
+    def test_sentences_with_expressions(self):
+        """Test that each sentence carries its own expressions"""
+        text = "*smile* Hello there! How are you? *giggle* I missed you."
+        chunks = self._parse_in_chunks(text, 3)
+        
+        self.assertEqual(chunks, [
+            (["smile"], "Hello there!"),
+            ([], "How are you?"),
+            (["giggle"], "I missed you."),
+        ])
+    
+    def test_tag_split_across_deltas(self):
+        """Test that a tag cut between deltas is still recognized"""
+        chunks = self._parse_in_chunks("*bl" + "ush* Hi.", 3)
+        self.assertEqual(chunks, [(["blush"], "Hi.")])
+    
+    def test_matches_batch_parser(self):
+        """Test that streaming output agrees with ExpressionParser.parse"""
+        text = "*smile*\nOh really? You think you can beat me?\n*giggle*\nThat's cute. *invalid* ok"
+        expected = ExpressionParser().parse(text)
         
-        for expr in supported:
-            text = f"*{expr}* text"
-            expressions, _ = self.parser.parse(text)
-            self.assertIn(expr, expressions)
+        for size in (1, 2, 5, len(text)):
+            chunks = self._parse_in_chunks(text, size)
+            expressions = [e for exprs, _ in chunks for e in exprs]
+            clean_text = " ".join(t for _, t in chunks if t)
+            self.assertEqual((expressions, clean_text), expected)
+    
+    def test_unterminated_tag_kept_as_text(self):
+        """Test that a '*' never closed on its line stays in the text"""
+        chunks = self._parse_in_chunks("a *broken\nline", 4)
+        self.assertEqual(chunks, [([], "a *broken"), ([], "line")])
+    
+    def test_flush_empty(self):
+        """Test that flushing with nothing buffered returns None"""
+        self.assertIsNone(StreamingExpressionParser().flush())
 
 
 if __name__ == "__main__":
@@ -3,14 +3,16 @@ Unit tests for Input Processor
 """
 
 import unittest
-import sys
+import io
 from pathlib import Path
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
+import input_processor
 from input_processor import InputProcessor
 
+# Shared audio payloads, allocated once per test process
+_SMALL_AUDIO = b"fake audio data" * 100
+_LARGE_AUDIO = bytes(11 * 1024 * 1024)  # 11 MB of zeros
+
 
 class TestInputProcessor(unittest.TestCase):
     """Test cases for InputProcessor"""
@@ -59,18 +61,35 @@ class TestInputProcessor(unittest.TestCase):
         processed = self.processor.process_text(text)
         self.assertEqual(len(processed), 1000)
     
+    def test_process_text_padded_input_ok(self):
+        """Test that the length limit applies to the cleaned text"""
+        text = " " * 5000 + "Hello" + "\n" * 5000
+        self.assertEqual(self.processor.process_text(text), "Hello")
+    
+    def test_process_text_raw_length_guard(self):
+        """Test that the optional raw-size guard rejects huge payloads"""
+        processor = InputProcessor(max_raw_text_length=100)
+        self.assertEqual(processor.process_text(" " * 90 + "Hi"), "Hi")
+        with self.assertRaises(ValueError) as ctx:
+            processor.process_text(" " * 100 + "Hi")
+        self.assertIn("too large", str(ctx.exception))
+    
+    def test_process_text_custom_max_length(self):
+        """Test that the length limit is configurable per processor"""
+        processor = InputProcessor(max_text_length=6)
+        self.assertEqual(processor.process_text("  Hi  you "), "Hi you")
+        with self.assertRaises(ValueError):
+            processor.process_text("Hello you")
+    
     def test_validate_audio_valid(self):
         """Test audio validation with valid data"""
-        audio_data = b"fake audio data" * 100
-        result = self.processor.validate_audio(audio_data)
+        result = self.processor.validate_audio(_SMALL_AUDIO)
         self.assertTrue(result)
     
     def test_validate_audio_too_large(self):
         """Test audio validation with too large file"""
-        # Create 11 MB of fake data
-        audio_data = b"x" * (11 * 1024 * 1024)
         with self.assertRaises(ValueError):
-            self.processor.validate_audio(audio_data, max_size_mb=10.0)
+            self.processor.validate_audio(_LARGE_AUDIO, max_size_mb=10.0)
     
     def test_validate_audio_too_small(self):
         """Test audio validation with too small file"""
@@ -84,6 +103,48 @@ class TestInputProcessor(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.processor.process_speech(audio_data)
     
+    def test_process_speech_temp_file_removed(self):
+        """Test that the temp file passed to STT is removed afterwards"""
+        seen = {}
+        
+        class MockSTT:
+            def transcribe(self, path, **options):
+                seen["path"] = path
+                seen["options"] = options
+                seen["existed"] = Path(path).exists()
+                return "  hello lucy  "
+        
+        self.processor.set_stt_engine(MockSTT())
+        text = self.processor.process_speech(b"fake audio data", "clip.ogg")
+        
+        self.assertEqual(text, "hello lucy")
+        self.assertTrue(seen["existed"])
+        self.assertTrue(seen["path"].endswith(".ogg"))
+        self.assertFalse(Path(seen["path"]).exists())
+        self.assertEqual(seen["options"], {
+            "beam_size": 1, "vad_filter": True, "condition_on_previous_text": True
+        })
+    
+    @unittest.skipUnless(input_processor._SOUNDFILE_AVAILABLE, "soundfile not installed")
+    def test_process_speech_in_memory(self):
+        """Test that 16 kHz audio is passed to STT as samples, not a file"""
+        import numpy as np
+        import soundfile as sf
+        
+        buffer = io.BytesIO()
+        sf.write(buffer, np.zeros(1600, dtype=np.float32), 16000, format="WAV")
+        
+        class MockSTT:
+            def transcribe(self, path, **options):
+                raise AssertionError("file path used")
+            
+            def transcribe_array(self, samples, sample_rate, **options):
+                return f"{len(samples)} samples at {sample_rate}"
+        
+        self.processor.set_stt_engine(MockSTT())
+        text = self.processor.process_speech(buffer.getvalue(), "clip.wav")
+        self.assertEqual(text, "1600 samples at 16000")
+    
     def test_set_stt_engine(self):
         """Test setting STT engine"""
         class MockSTT:
@@ -3,47 +3,47 @@ Unit tests for WebRAG module
 """
 
 import unittest
-import sys
-from pathlib import Path
-from unittest.mock import patch, MagicMock
+from contextlib import contextmanager
+from unittest.mock import patch
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import pytest
 
 from rag_web_search import WebRAG, WebSearchResult
 
 
-class TestWebRAG(unittest.TestCase):
-    """Test cases for WebRAG"""
+class FakeDDGS:
+    """DDGS stub: a context manager whose text() returns fixed results"""
 
-    def setUp(self):
-        """Set up test instance with search mocked as unavailable"""
-        self.rag = WebRAG(max_results=3, snippet_max_chars=200)
+    def __init__(self, results):
+        self.results = results
+        self.text_calls = 0
 
-    # ------------------------------------------------------------------
-    # should_search()
-    # ------------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def text(self, query, max_results=None):
+        self.text_calls += 1
+        return self.results
 
-    def test_should_search_with_what_is(self):
-        """Queries starting with 'what is' should trigger a search"""
-        self.assertTrue(self.rag.should_search("what is quantum computing?"))
 
-    def test_should_search_with_latest(self):
-        """Queries containing 'latest' should trigger a search"""
-        self.assertTrue(self.rag.should_search("What is the latest AI news?"))
+@contextmanager
+def patch_ddgs(results=None, side_effect=None):
+    """Patch rag_web_search.DDGS; yields the FakeDDGS every DDGS() returns"""
+    fake = FakeDDGS(results or [])
+    with patch("rag_web_search.DDGS", return_value=fake,
+               side_effect=side_effect, create=True):
+        yield fake
 
-    def test_should_search_how_to(self):
-        """Queries with 'how to' should trigger a search"""
-        self.assertTrue(self.rag.should_search("how to bake a cake"))
 
-    def test_should_search_casual_conversation(self):
-        """Casual conversation should NOT trigger a search"""
-        self.assertFalse(self.rag.should_search("hello!"))
-        self.assertFalse(self.rag.should_search("you're so cute"))
+class TestWebRAG(unittest.TestCase):
+    """Test cases for WebRAG"""
 
-    def test_should_search_case_insensitive(self):
-        """should_search should be case-insensitive"""
-        self.assertTrue(self.rag.should_search("WHAT IS the speed of light?"))
+    def setUp(self):
+        """Set up test instance with search mocked as unavailable"""
+        self.rag = WebRAG(max_results=3, snippet_max_chars=200)
 
     # ------------------------------------------------------------------
     # format_context()
@@ -62,6 +62,12 @@ class TestWebRAG(unittest.TestCase):
         self.assertIn("Test Title", context)
         self.assertIn("Test body text.", context)
 
+    def test_search_result_is_immutable(self):
+        """Cached results are shared, so they cannot be modified"""
+        result = WebSearchResult("AI News", "Body", "https://news.com")
+        with self.assertRaises(AttributeError):
+            result.title = "Changed"
+
     def test_format_context_multiple_results(self):
         """Multiple results are all included"""
         results = [
@@ -88,21 +94,15 @@ class TestWebRAG(unittest.TestCase):
 
     def test_search_returns_results_when_ddgs_available(self):
         """search() returns WebSearchResult list when DDGS is available"""
-        mock_ddgs_instance = MagicMock()
-        mock_ddgs_instance.text.return_value = [
+        ddgs_results = [
             {"title": "T1", "body": "B1", "href": "https://a.com"},
             {"title": "T2", "body": "B2", "href": "https://b.com"},
         ]
-        mock_ddgs_context = MagicMock()
-        mock_ddgs_context.__enter__ = MagicMock(return_value=mock_ddgs_instance)
-        mock_ddgs_context.__exit__ = MagicMock(return_value=False)
 
-        rag = WebRAG.__new__(WebRAG)
-        rag.max_results = 3
-        rag.snippet_max_chars = 200
+        rag = WebRAG(max_results=3, snippet_max_chars=200)
         rag._ddgs_available = True
 
-        with patch("rag_web_search.DDGS", return_value=mock_ddgs_context, create=True):
+        with patch_ddgs(ddgs_results):
             results = rag.search("test query")
 
         self.assertEqual(len(results), 2)
@@ -111,16 +111,45 @@ class TestWebRAG(unittest.TestCase):
 
     def test_search_handles_exception_gracefully(self):
         """search() returns [] when DDGS raises an exception"""
-        rag = WebRAG.__new__(WebRAG)
-        rag.max_results = 3
-        rag.snippet_max_chars = 200
+        rag = WebRAG(max_results=3, snippet_max_chars=200)
         rag._ddgs_available = True
 
-        with patch("rag_web_search.DDGS", side_effect=Exception("network error"), create=True):
+        with patch_ddgs(side_effect=Exception("network error")):
             results = rag.search("test query")
 
         self.assertEqual(results, [])
 
+    def test_search_results_cached_by_normalized_query(self):
+        """Repeated queries differing only in case/whitespace hit the cache"""
+        ddgs_results = [
+            {"title": "T1", "body": "B1", "href": "https://a.com"},
+        ]
+
+        rag = WebRAG(max_results=3, snippet_max_chars=200)
+        rag._ddgs_available = True
+
+        with patch_ddgs(ddgs_results) as ddgs:
+            first = rag.search("What is AI?")
+            second = rag.search("  what is ai?")
+
+        self.assertEqual(first, second)
+        self.assertEqual(ddgs.text_calls, 1)
+
+    def test_search_cache_expires(self):
+        """Cached results are refetched once the TTL has passed"""
+        ddgs_results = [
+            {"title": "T1", "body": "B1", "href": "https://a.com"},
+        ]
+
+        rag = WebRAG(max_results=3, snippet_max_chars=200, cache_ttl=0)
+        rag._ddgs_available = True
+
+        with patch_ddgs(ddgs_results) as ddgs:
+            rag.search("test query")
+            rag.search("test query")
+
+        self.assertEqual(ddgs.text_calls, 2)
+
     # ------------------------------------------------------------------
     # augment_query()
     # ------------------------------------------------------------------
@@ -139,9 +168,7 @@ class TestWebRAG(unittest.TestCase):
 
     def test_augment_query_returns_context_when_results_exist(self):
         """augment_query returns formatted context when results exist"""
-        rag = WebRAG.__new__(WebRAG)
-        rag.max_results = 3
-        rag.snippet_max_chars = 200
+        rag = WebRAG(max_results=3, snippet_max_chars=200)
         rag._ddgs_available = True
 
         mock_result = WebSearchResult("AI News", "Some AI news body text.", "https://news.com")
@@ -171,24 +198,41 @@ class TestWebRAG(unittest.TestCase):
         """Search results should be truncated to snippet_max_chars"""
         long_body = "x" * 500
 
-        mock_ddgs_instance = MagicMock()
-        mock_ddgs_instance.text.return_value = [
+        ddgs_results = [
             {"title": "T", "body": long_body, "href": "https://a.com"},
         ]
-        mock_ddgs_context = MagicMock()
-        mock_ddgs_context.__enter__ = MagicMock(return_value=mock_ddgs_instance)
-        mock_ddgs_context.__exit__ = MagicMock(return_value=False)
 
-        rag = WebRAG.__new__(WebRAG)
-        rag.max_results = 3
-        rag.snippet_max_chars = 200
+        rag = WebRAG(max_results=3, snippet_max_chars=200)
         rag._ddgs_available = True
 
-        with patch("rag_web_search.DDGS", return_value=mock_ddgs_context, create=True):
+        with patch_ddgs(ddgs_results):
             results = rag.search("test")
 
         self.assertLessEqual(len(results[0].body), 200)
 
 
+@pytest.fixture(scope="module")
+def rag():
+    """One WebRAG for the read-only should_search tests"""
+    return WebRAG(max_results=3, snippet_max_chars=200)
+
+
+@pytest.mark.parametrize("query", [
+    "what is quantum computing?",
+    "What is the latest AI news?",
+    "how to bake a cake",
+    "WHAT IS the speed of light?",
+])
+def test_should_search(rag, query):
+    """Factual, news and how-to queries trigger a search in any case"""
+    assert rag.should_search(query)
+
+
+@pytest.mark.parametrize("query", ["hello!", "you're so cute"])
+def test_should_not_search_casual_conversation(rag, query):
+    """Casual conversation should NOT trigger a search"""
+    assert not rag.should_search(query)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,144 @@
+"""
+Unit tests for TTS Handler
+"""
+
+import os
+import shutil
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from tts_handler import TTSHandler
+
+
+class MockTTSEngine:
+    """TTS engine stub that writes the text to the output file"""
+
+    def __init__(self):
+        self.calls = []
+
+    def synthesize(self, text, expressions, output_path):
+        self.calls.append(text)
+        Path(output_path).write_text(text)
+        return output_path
+
+
+class TestTTSHandler(unittest.TestCase):
+    """Test cases for TTSHandler"""
+
+    def setUp(self):
+        """Set up handler writing to a temporary directory"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.engine = MockTTSEngine()
+        self.handler = TTSHandler(self.engine, self.tmp_dir.name)
+
+    def tearDown(self):
+        self.handler.close()
+        self.tmp_dir.cleanup()
+
+    @unittest.skipUnless(shutil.which("false"), "needs the false command")
+    def test_wav_fallback_reused_after_restart(self):
+        """Test that WAV published after a failed Opus encode is found on disk"""
+        with patch("tts_handler.shutil.which", return_value=shutil.which("false")):
+            handler = TTSHandler(self.engine, self.tmp_dir.name, audio_format="opus")
+            path = handler.synthesize("Hello!", [])
+            restarted = TTSHandler(self.engine, self.tmp_dir.name, audio_format="opus")
+            self.assertEqual(restarted.synthesize("Hello!", []), path)
+
+        self.assertTrue(path.endswith(".wav"))
+        self.assertEqual(self.engine.calls, ["Hello!"])
+
+    def test_synthesize_async(self):
+        """Test that synthesize_async resolves to the synthesized file"""
+        future = self.handler.synthesize_async("Hello!", ["smile"])
+        path = future.result(timeout=5)
+        self.assertEqual(Path(path).read_text(), "Hello!")
+        self.assertEqual(self.handler.synthesize("Hello!", ["smile"]), path)
+
+    def test_cache_key_ignores_secondary_expression_order(self):
+        """Test that only the primary (first) expression's position matters"""
+        key = self.handler._generate_cache_key
+        self.assertEqual(key("t", ["smile", "a", "b"]), key("t", ["smile", "b", "a"]))
+        self.assertNotEqual(key("t", ["a", "b"]), key("t", ["b", "a"]))
+
+    def test_synthesized_file_reused_after_restart(self):
+        """Test that a new handler reuses audio already on disk"""
+        path = self.handler.synthesize("Hello!", ["smile"])
+
+        engine = MockTTSEngine()
+        restarted = TTSHandler(engine, self.tmp_dir.name)
+
+        self.assertEqual(restarted.synthesize("Hello!", ["smile"]), path)
+        self.assertEqual(engine.calls, [])
+
+    def test_voice_is_part_of_cache_key(self):
+        """Test that different voices never share audio files"""
+        self.engine.voice = "voice_a"
+        path_a = TTSHandler(self.engine, self.tmp_dir.name).synthesize("Hi.", [])
+        self.engine.voice = "voice_b"
+        path_b = TTSHandler(self.engine, self.tmp_dir.name).synthesize("Hi.", [])
+
+        self.assertNotEqual(path_a, path_b)
+
+    def test_cache_is_bounded(self):
+        """Test that the in-memory cache evicts the least recently used entry"""
+        handler = TTSHandler(self.engine, self.tmp_dir.name, cache_size=2)
+        first = handler.synthesize("One.", [])
+        handler.synthesize("Two.", [])
+        handler.synthesize("One.", [])  # Refresh "One."
+        handler.synthesize("Three.", [])
+
+        self.assertEqual(len(handler.cache), 2)
+        self.assertIn(first, handler.cache.values())
+
+    def test_no_temporary_files_left(self):
+        """Test that synthesis publishes only the final file"""
+        self.handler.synthesize("Hello!", [])
+        names = [p.name for p in Path(self.tmp_dir.name).iterdir()]
+
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].startswith("tts_"))
+
+    def test_cleanup_old_files(self):
+        """Test that expired audio and leftover temporary files are removed"""
+        old = self.handler.synthesize("Old.", [])
+        new = self.handler.synthesize("New.", [])
+        leftover = Path(self.tmp_dir.name) / "tmp_abandoned.wav"
+        leftover.write_text("partial")
+        os.utime(old, (0, 0))
+        os.utime(leftover, (0, 0))
+
+        self.handler.cleanup_old_files(max_age_hours=1)
+
+        self.assertFalse(Path(old).exists())
+        self.assertFalse(leftover.exists())
+        self.assertTrue(Path(new).exists())
+
+    def test_enforce_size_limit_evicts_oldest(self):
+        """Test that the least recently used files are evicted first"""
+        old = self.handler.synthesize("Old.", [])
+        new = self.handler.synthesize("New.", [])
+        os.utime(old, (0, 0))
+
+        self.handler.enforce_size_limit(len("New."))
+
+        self.assertFalse(Path(old).exists())
+        self.assertTrue(Path(new).exists())
+
+    def test_memory_hit_protects_file_from_eviction(self):
+        """Test that a file served from the in-memory cache counts as used"""
+        hot = self.handler.synthesize("Hot.", [])
+        cold = self.handler.synthesize("Cold.", [])
+        os.utime(hot, (0, 0))
+        os.utime(cold, (1, 1))
+
+        self.assertEqual(self.handler.synthesize("Hot.", []), hot)
+        self.handler.enforce_size_limit(len("Hot."))
+
+        self.assertTrue(Path(hot).exists())
+        self.assertFalse(Path(cold).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
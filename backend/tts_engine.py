@@ -3,22 +3,51 @@ Text-to-Speech Engine
 Supports OpenVoice (primary) and Piper TTS (fallback)
 """
 
+from collections import deque
 from pathlib import Path
+import atexit
+import json
+import logging
+import queue
 import re
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import subprocess
+import threading
+
+logger = logging.getLogger("lucy")
 
 
 class TTSEngine:
-    def __init__(self, engine: str = "piper", voice: str = "en_US-lessac-medium"):
+    # Leftover *expression* tags (compiled once, not looked up per call)
+    _STAR_RE = re.compile(r"\*.*?\*")
+    
+    def __init__(self, engine: str = "piper", voice: str = "en_US-lessac-medium",
+                 persistent: bool = False, read_timeout: float = 30.0):
         """Initialize TTS Engine
         
         Args:
             engine: "piper" or "openvoice"
             voice: Voice model to use
+            persistent: Keep one Piper process running (model loaded once)
+                instead of starting a new one per utterance
+            read_timeout: Seconds to wait for the persistent Piper process
+                to finish an utterance before it is killed and restarted
         """
         self.engine = engine
         self.voice = voice
+        self.persistent = persistent
+        self.read_timeout = read_timeout
+        
+        # Long-lived Piper process fed one JSON line per utterance; requests
+        # are serialized because its stdin/stdout carry one job at a time
+        self._piper_proc: Optional[subprocess.Popen] = None
+        # Lines Piper prints on stdout, read by a thread so waits can time out
+        self._piper_replies: Optional[queue.Queue] = None
+        # Last lines Piper wrote to stderr, quoted when it fails
+        self._piper_stderr: deque = deque(maxlen=20)
+        self._stderr_reader: Optional[threading.Thread] = None
+        self._piper_lock = threading.Lock()
+        self._atexit_registered = False
         
         # Expression to audio effect mapping
         self.expression_effects = {
@@ -44,7 +73,8 @@ class TTSEngine:
             TTS-ready text
         """
         # Remove any remaining asterisks
-        text = re.sub(r"\*.*?\*", "", text)
+        if "*" in text:
+            text = self._STAR_RE.sub("", text)
         
         # TODO: Add SSML tags for emotion control if using advanced TTS
         # Example: <prosody rate="fast" pitch="+5%">text</prosody>
@@ -65,6 +95,9 @@ class TTSEngine:
         # Install: pip install piper-tts
         # Download models from: https://github.com/rhasspy/piper
         
+        if self.persistent:
+            return self._synthesize_piper_persistent(text, output_path)
+        
         cmd = [
             "piper",
             "--model", self.voice,
@@ -72,22 +105,158 @@ class TTSEngine:
         ]
         
         try:
+            # Piper writes the WAV to --output_file; stdout is never read
             process = subprocess.Popen(
                 cmd,
                 stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
                 stderr=subprocess.PIPE
             )
-            stdout, stderr = process.communicate(input=text.encode())
+            _, stderr = process.communicate(input=text.encode())
             
             if process.returncode != 0:
-                raise Exception(f"Piper TTS error: {stderr.decode()}")
+                raise Exception(f"Piper TTS error: {stderr.decode(errors='replace')}")
             
             return output_path
         
         except Exception as e:
             raise Exception(f"TTS synthesis failed: {str(e)}")
     
+    def _synthesize_piper_persistent(self, text: str, output_path: str) -> str:
+        """Synthesize with the long-lived Piper process
+        
+        Piper's --json-input mode reads one {"text", "output_file"} object
+        per line and prints each written path, so the voice model is loaded
+        once instead of on every utterance.
+        
+        Args:
+            text: Text to synthesize
+            output_path: Output audio file path
+        
+        Returns:
+            Path to generated audio file
+        """
+        output_path = str(Path(output_path).resolve())
+        request = json.dumps({"text": text, "output_file": output_path})
+        
+        with self._piper_lock:
+            try:
+                process = self._get_piper_process(Path(output_path).parent)
+                process.stdin.write(request + "\n")
+                process.stdin.flush()
+                try:
+                    written = self._piper_replies.get(timeout=self.read_timeout)
+                except queue.Empty:
+                    # Hung process: kill it so later requests are not stuck
+                    self._stop_piper()
+                    raise Exception(
+                        f"TTS synthesis failed: Piper did not respond "
+                        f"within {self.read_timeout:g}s{self._stderr_tail()}"
+                    )
+            except (OSError, ValueError) as e:
+                self._stop_piper()
+                raise Exception(f"TTS synthesis failed: {str(e)}")
+            
+            if not written:
+                # Process exited (bad model, crash); start fresh next time
+                self._stop_piper()
+                raise Exception(
+                    f"TTS synthesis failed: Piper process exited{self._stderr_tail()}"
+                )
+        
+        if not Path(output_path).exists():
+            raise Exception(f"TTS synthesis failed: Piper wrote no audio for {text!r}")
+        return output_path
+    
+    def _get_piper_process(self, output_dir: Path) -> subprocess.Popen:
+        """Return the running Piper process, starting it if needed"""
+        process = self._piper_proc
+        if process is None or process.poll() is not None:
+            process = subprocess.Popen(
+                [
+                    "piper",
+                    "--model", self.voice,
+                    "--json-input",
+                    "--output_dir", str(output_dir)
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1
+            )
+            # Each process gets its own queue, so a killed process's reader
+            # can never hand a stale reply to its replacement
+            replies = queue.Queue()
+            threading.Thread(
+                target=self._read_replies, args=(process.stdout, replies),
+                name="piper-stdout", daemon=True
+            ).start()
+            # Drained continuously so a chatty Piper never fills the pipe
+            self._piper_stderr.clear()
+            self._stderr_reader = threading.Thread(
+                target=self._read_stderr, args=(process.stderr, self._piper_stderr),
+                name="piper-stderr", daemon=True
+            )
+            self._stderr_reader.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+            self._piper_proc = process
+            self._piper_replies = replies
+        return process
+    
+    @staticmethod
+    def _read_replies(stdout, replies: queue.Queue):
+        """Forward Piper's output lines to replies; "" marks end of output"""
+        try:
+            for line in stdout:
+                replies.put(line)
+        except (OSError, ValueError):
+            pass
+        replies.put("")
+    
+    @staticmethod
+    def _read_stderr(stderr, tail: deque):
+        """Log Piper's diagnostics and keep the most recent lines"""
+        try:
+            for line in stderr:
+                line = line.rstrip()
+                if line:
+                    tail.append(line)
+                    logger.debug("piper: %s", line)
+        except (OSError, ValueError):
+            pass
+    
+    def _stderr_tail(self) -> str:
+        """Recent Piper stderr output, formatted for an error message"""
+        if not self._piper_stderr:
+            return ""
+        return ": " + " | ".join(self._piper_stderr)
+    
+    def _stop_piper(self):
+        """Terminate the Piper process, if running"""
+        process, self._piper_proc = self._piper_proc, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        # Let the reader collect the last diagnostics before they are quoted
+        if self._stderr_reader is not None:
+            self._stderr_reader.join(timeout=1)
+    
+    def close(self):
+        """Stop the persistent Piper process"""
+        with self._piper_lock:
+            self._stop_piper()
+    
     def synthesize_openvoice(self, text: str, output_path: str, emotion: str = "neutral") -> str:
         """Synthesize speech using OpenVoice with emotion control
         
@@ -3,29 +3,71 @@ TTS Handler for Lucy AI Companion
 Handles text-to-speech synthesis with expression awareness
 """
 
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 import hashlib
+import os
+import shutil
+import subprocess
+import threading
 import time
+import uuid
+
+# Optional fast non-cryptographic hash for cache keys – falls back to BLAKE2b
+try:
+    import xxhash
+    _XXHASH_AVAILABLE = True
+except ImportError:
+    xxhash = None
+    _XXHASH_AVAILABLE = False
 
 
 class TTSHandler:
     """Handle TTS synthesis with expression-aware voice modulation"""
     
-    def __init__(self, tts_engine, output_dir: str = "./audio_output"):
+    def __init__(self, tts_engine, output_dir: str = "./audio_output",
+                 audio_format: str = "wav", opus_bitrate: str = "32k",
+                 cache_size: int = 512, max_workers: int = 2):
         """
         Initialize TTS handler
         
         Args:
             tts_engine: TTS engine instance
             output_dir: Directory for audio output files
+            audio_format: "wav", or "opus" to re-encode with ffmpeg
+                (about a third of the bytes; falls back to wav without ffmpeg)
+            opus_bitrate: Opus bitrate passed to ffmpeg
+            cache_size: Maximum number of in-memory cache entries (the
+                files themselves are bounded by enforce_size_limit)
+            max_workers: Threads used by synthesize_async
         """
         self.tts_engine = tts_engine
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True, parents=True)
         
-        # Cache for generated audio files
-        self.cache = {}
+        self.opus_bitrate = opus_bitrate
+        self._ffmpeg = shutil.which("ffmpeg") if audio_format == "opus" else None
+        if audio_format == "opus" and self._ffmpeg is None:
+            print("Warning: ffmpeg not found. TTS audio will be served as WAV.")
+        self._suffix = ".opus" if self._ffmpeg else ".wav"
+        self._disk_suffixes = (self._suffix, ".wav") if self._ffmpeg else (".wav",)
+        
+        # The voice is part of the cache key so switching voices never
+        # serves audio synthesized with the old one
+        self._voice = getattr(tts_engine, "voice", "")
+        
+        # LRU cache of generated audio file paths, shared by the threads
+        # synthesizing concurrently
+        self.cache_size = cache_size
+        self.cache: OrderedDict[Tuple, str] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # Dedicated pool so slow synthesis never starves the event loop's
+        # default executor (used for LLM and RAG calls)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="tts")
     
     def synthesize(self, text: str, expressions: List[str], 
                   use_cache: bool = True) -> str:
@@ -43,46 +85,164 @@ class TTSHandler:
         if not text or not text.strip():
             raise ValueError("Cannot synthesize empty text")
         
-        # Generate cache key
-        cache_key = self._generate_cache_key(text, expressions)
-        
-        # Check cache
-        if use_cache and cache_key in self.cache:
-            cached_path = self.cache[cache_key]
-            if Path(cached_path).exists():
+        memory_key = self._memory_key(text, expressions)
+        if use_cache:
+            cached_path = self._cache_get(memory_key)
+            if cached_path is not None:
                 return cached_path
         
-        # Generate output filename
-        timestamp = int(time.time() * 1000)
-        output_filename = f"tts_{timestamp}_{cache_key[:8]}.wav"
-        output_path = str(self.output_dir / output_filename)
+        # The content hash is only needed once the in-memory cache misses
+        cache_key = self._generate_cache_key(text, expressions)
+        if use_cache:
+            disk_path = self._disk_get(cache_key)
+            if disk_path is not None:
+                self._cache_put(memory_key, disk_path)
+                return disk_path
         
-        # Synthesize speech
+        # Synthesize into a unique temporary name, then publish atomically so
+        # concurrent requests for the same text never see a partial file
+        tmp_path = self._tmp_path(cache_key)
         try:
-            audio_path = self.tts_engine.synthesize(text, expressions, output_path)
-            
-            # Cache the result
-            if use_cache:
-                self.cache[cache_key] = audio_path
-            
-            return audio_path
-            
+            audio_path = self.tts_engine.synthesize(text, expressions, str(tmp_path))
+            final_path = self._publish(cache_key, audio_path)
         except Exception as e:
+            tmp_path.unlink(missing_ok=True)
             raise RuntimeError(f"TTS synthesis failed: {str(e)}")
+        
+        # Cache the result
+        if use_cache:
+            self._cache_put(memory_key, final_path)
+        return final_path
+    
+    def synthesize_async(self, text: str, expressions: List[str],
+                         use_cache: bool = True) -> Future:
+        """
+        Run synthesize on the handler's thread pool
+        
+        Wrap the result with asyncio.wrap_future to await it from async code.
+        
+        Args:
+            text: Clean text to synthesize (expressions already removed)
+            expressions: List of expressions for tone modulation
+            use_cache: Whether to use cached audio if available
+            
+        Returns:
+            Future resolving to the audio file path
+        """
+        return self._pool.submit(self.synthesize, text, expressions, use_cache)
+    
+    def _disk_get(self, cache_key: str) -> Optional[str]:
+        """Return audio already synthesized to disk for cache_key"""
+        # Files are content-addressed, so audio synthesized before a restart
+        # (or by another worker) is reused straight from disk. A failed Opus
+        # encode publishes the WAV instead, so look for that too.
+        for suffix in self._disk_suffixes:
+            output_path = self.output_dir / f"tts_{cache_key}{suffix}"
+            try:
+                # Marks the file as recently used for eviction; raises if
+                # it is missing or was just removed by cleanup
+                os.utime(output_path)
+            except FileNotFoundError:
+                continue
+            return str(output_path)
+        return None
+    
+    def _tmp_path(self, cache_key: str) -> Path:
+        """Unique temporary WAV path to synthesize cache_key into"""
+        return self.output_dir / f"tmp_{cache_key}_{uuid.uuid4().hex[:8]}.wav"
+    
+    def _publish(self, cache_key: str, audio_path: str) -> str:
+        """Encode if configured and move audio to its final name"""
+        if self._ffmpeg:
+            audio_path = self._encode_opus(audio_path)
+        
+        final_path = self.output_dir / f"tts_{cache_key}{Path(audio_path).suffix}"
+        os.replace(audio_path, final_path)
+        return str(final_path)
+    
+    def _cache_get(self, key: Tuple) -> Optional[str]:
+        """Return the cached audio path for key if the file still exists"""
+        with self._cache_lock:
+            path = self.cache.get(key)
+            if path is None:
+                return None
+            try:
+                # File eviction goes by mtime, so every hit marks the file
+                # as recently used; it may also have been removed by
+                # cleanup or another worker
+                os.utime(path)
+            except FileNotFoundError:
+                del self.cache[key]
+                return None
+            self.cache.move_to_end(key)
+            return path
+    
+    def _cache_put(self, key: Tuple, path: str):
+        """Store the audio path for key, evicting the least recently used"""
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self.cache[key] = path
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+    
+    def _encode_opus(self, wav_path: str) -> str:
+        """
+        Re-encode a WAV file as Ogg Opus and remove the WAV
+        
+        Args:
+            wav_path: Path to the synthesized WAV file
+            
+        Returns:
+            Path to the .opus file, or wav_path if encoding failed
+        """
+        opus_path = str(Path(wav_path).with_suffix(".opus"))
+        result = subprocess.run(
+            [self._ffmpeg, "-y", "-loglevel", "error", "-i", wav_path,
+             "-c:a", "libopus", "-b:a", self.opus_bitrate, opus_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        if result.returncode != 0:
+            print(f"Opus encoding warning: {result.stderr.decode(errors='replace').strip()}")
+            return wav_path
+        
+        Path(wav_path).unlink(missing_ok=True)
+        return opus_path
+    
+    @staticmethod
+    def _memory_key(text: str, expressions: List[str]) -> Tuple:
+        """
+        In-memory cache key: the same fields as the file hash, as a tuple
+        
+        Hashing a tuple of strings reuses each string's cached hash, so a
+        cache hit never encodes the text or runs the content hash.
+        """
+        primary = expressions[0] if expressions else ""
+        return (text, primary, tuple(sorted(expressions[1:])))
     
     def _generate_cache_key(self, text: str, expressions: List[str]) -> str:
         """
         Generate cache key for text and expressions
         
+        The first expression sets the voice emotion, so it stays in place;
+        the rest are sorted, so callers may list them in any order and
+        still hit the cache.
+        
         Args:
             text: Text content
             expressions: List of expressions
             
         Returns:
-            Cache key (hash)
+            Cache key (128-bit hex hash), also used as the audio file name
         """
-        content = f"{text}|{','.join(expressions)}"
-        return hashlib.md5(content.encode()).hexdigest()
+        primary = expressions[0] if expressions else ""
+        others = ";".join(sorted(expressions[1:]))
+        content = f"{text}|{primary}|{others}|{self._voice}".encode()
+        if _XXHASH_AVAILABLE:
+            return xxhash.xxh3_128_hexdigest(content)
+        return hashlib.blake2b(content, digest_size=16).hexdigest()
     
     def clean_text_for_tts(self, text: str) -> str:
         """
@@ -105,7 +265,15 @@ class TTSHandler:
     
     def clear_cache(self):
         """Clear the audio cache"""
-        self.cache.clear()
+        with self._cache_lock:
+            self.cache.clear()
+    
+    def close(self):
+        """Stop accepting async work and stop the engine's processes"""
+        self._pool.shutdown(wait=False)
+        close_engine = getattr(self.tts_engine, "close", None)
+        if close_engine is not None:
+            close_engine()
     
     def cleanup_old_files(self, max_age_hours: int = 24):
         """
@@ -114,19 +282,63 @@ class TTSHandler:
         Args:
             max_age_hours: Maximum age of files to keep (in hours)
         """
-        import time
+        cutoff = time.time() - max_age_hours * 3600
         
-        current_time = time.time()
-        max_age_seconds = max_age_hours * 3600
-        
-        for audio_file in self.output_dir.glob("tts_*.wav"):
-            file_age = current_time - audio_file.stat().st_mtime
-            if file_age > max_age_seconds:
+        # tmp_* files are leftovers from synthesis interrupted mid-write
+        for entry, st in self._scan_files(("tts_", "tmp_")):
+            if st.st_mtime < cutoff:
                 try:
-                    audio_file.unlink()
-                except Exception:
+                    os.unlink(entry.path)
+                except OSError:
                     pass
     
+    def enforce_size_limit(self, max_bytes: int):
+        """
+        Evict least recently used audio files until the directory fits
+        
+        Cache hits refresh a file's mtime, so the oldest mtime is the least
+        recently used file.
+        
+        Args:
+            max_bytes: Maximum total size of audio files to keep
+        """
+        files = []
+        total = 0
+        for entry, st in self._scan_files(("tts_",)):
+            files.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+        
+        if total <= max_bytes:
+            return
+        
+        files.sort()
+        for _, size, path in files:
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= max_bytes:
+                break
+    
+    def _scan_files(self, prefixes: Tuple[str, ...]
+                    ) -> Iterator[Tuple[os.DirEntry, os.stat_result]]:
+        """
+        Yield (DirEntry, stat) for output files whose name has a prefix
+        
+        One os.scandir pass, without a Path object per file; files removed
+        mid-scan are skipped.
+        """
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                if not entry.name.startswith(prefixes):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                yield entry, st
+    
     def get_audio_url(self, audio_path: str, base_url: str) -> str:
         """
         Convert local audio path to URL
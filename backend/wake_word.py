@@ -3,8 +3,77 @@ Wake word detection for Lucy AI Companion
 Detects activation phrases ("hey lucy", "hi lucy", etc.) in transcribed speech
 """
 
+import functools
 import re
-from typing import List, Optional
+from typing import Dict, List, Optional, Pattern, Tuple
+
+# Optional C Aho-Corasick automaton – falls back to a regex alternation
+try:
+    import ahocorasick
+    _AHOCORASICK_AVAILABLE = True
+except ImportError:
+    ahocorasick = None
+    _AHOCORASICK_AVAILABLE = False
+
+
+# Characters dropped before matching: everything except a-z, 0-9 and
+# whitespace. For ASCII text, deleting these bytes with bytes.translate is
+# a single C pass, several times faster than the equivalent regex.
+_CLEAN_RE = re.compile(r"[^a-z0-9\s]")
+_ASCII_DELETE = bytes(
+    c for c in range(128)
+    if not (chr(c).isspace() or "a" <= chr(c) <= "z" or "0" <= chr(c) <= "9")
+)
+
+
+def _clean_transcription(text: str) -> str:
+    """Lower-case text and strip everything but letters, digits and spaces"""
+    text = text.lower()
+    if text.isascii():
+        return text.encode("ascii").translate(None, _ASCII_DELETE).decode("ascii")
+    return _CLEAN_RE.sub("", text)
+
+
+def _compile_wake_pattern(wake_words: List[str]) -> Optional[Pattern]:
+    """
+    Compile wake word phrases into a single alternation regex
+
+    One regex scan replaces a separate substring search per phrase. Longer
+    phrases come first so the longest phrase wins at a given position.
+
+    Args:
+        wake_words: Normalised (lower-case) wake word phrases
+
+    Returns:
+        Compiled pattern, or None if there are no phrases
+    """
+    if not wake_words:
+        return None
+    phrases = sorted(wake_words, key=len, reverse=True)
+    return re.compile("|".join(re.escape(p) for p in phrases))
+
+
+def _build_wake_automaton(wake_words: List[str]):
+    """
+    Build an Aho-Corasick automaton over the wake word phrases
+
+    Scans the text once in C regardless of the number of phrases, and
+    unlike a regex alternation never re-tries phrases at each position,
+    which pays off on long transcriptions without a wake word.
+
+    Args:
+        wake_words: Normalised (lower-case) wake word phrases
+
+    Returns:
+        Automaton, or None if there are no phrases
+    """
+    if not wake_words:
+        return None
+    automaton = ahocorasick.Automaton()
+    for phrase in wake_words:
+        automaton.add_word(phrase, phrase)
+    automaton.make_automaton()
+    return automaton
 
 
 class WakeWordDetector:
@@ -36,12 +105,36 @@ class WakeWordDetector:
             wake_words: Custom list of wake word phrases (uses defaults if None)
             stt_engine: WhisperSTT instance for transcribing audio files
         """
-        self.wake_words: List[str] = (
-            [w.lower().strip() for w in wake_words]
+        # Insertion-ordered set of phrases: the dict keeps the order while
+        # giving add/remove constant-time membership checks
+        self._wake_set: Dict[str, None] = dict.fromkeys(
+            # Blank phrases (e.g. a trailing comma in WAKE_WORDS) are dropped:
+            # the regex fallback would match them in every transcription
+            (w.lower().strip() for w in wake_words if w and w.strip())
             if wake_words is not None
-            else list(self.DEFAULT_WAKE_WORDS)
+            else self.DEFAULT_WAKE_WORDS
         )
         self.stt_engine = stt_engine
+        # Streaming STT re-sends overlapping windows, so identical
+        # transcriptions are common; cleared whenever the phrases change
+        self._detect_cached = functools.lru_cache(maxsize=1024)(self._match)
+        self._rebuild_matcher()
+
+    @property
+    def wake_words(self) -> Tuple[str, ...]:
+        """Current wake word phrases, in the order they were added"""
+        return tuple(self._wake_set)
+
+    def _rebuild_matcher(self) -> None:
+        """Recompile the phrase matcher after the wake words change"""
+        if _AHOCORASICK_AVAILABLE:
+            self._wake_automaton = _build_wake_automaton(list(self._wake_set))
+            self._wake_pattern = None
+        else:
+            self._wake_automaton = None
+            self._wake_pattern = _compile_wake_pattern(list(self._wake_set))
+        # Results computed with the old phrases must not be served again
+        self._detect_cached.cache_clear()
 
     # ------------------------------------------------------------------
     # Detection helpers
@@ -60,14 +153,21 @@ class WakeWordDetector:
         if not transcription:
             return False
 
-        # Normalise: lower-case and strip punctuation for fuzzy matching
-        text_clean = re.sub(r"[^a-z0-9\s]", "", transcription.lower())
+        return self._detect_cached(transcription)
 
-        for wake_word in self.wake_words:
-            if wake_word in text_clean:
-                return True
+    def _match(self, transcription: str) -> bool:
+        """Normalise a transcription and match it against the wake words"""
+        automaton = self._wake_automaton
+        if automaton is None and self._wake_pattern is None:
+            return False
+
+        # Normalise: lower-case and strip punctuation for fuzzy matching
+        text_clean = _clean_transcription(transcription)
 
-        return False
+        if automaton is not None:
+            # Stop at the first match instead of collecting them all
+            return next(automaton.iter(text_clean), None) is not None
+        return self._wake_pattern.search(text_clean) is not None
 
     def detect_from_audio(self, audio_path: str) -> bool:
         """
@@ -96,7 +196,7 @@ class WakeWordDetector:
 
     def get_wake_words(self) -> List[str]:
         """Return a copy of the current wake word list"""
-        return self.wake_words.copy()
+        return list(self._wake_set)
 
     def add_wake_word(self, wake_word: str) -> None:
         """
@@ -106,8 +206,10 @@ class WakeWordDetector:
             wake_word: Phrase to add (case-insensitive)
         """
         normalised = wake_word.lower().strip()
-        if normalised not in self.wake_words:
-            self.wake_words.append(normalised)
+        if not normalised or normalised in self._wake_set:
+            return
+        self._wake_set[normalised] = None
+        self._rebuild_matcher()
 
     def remove_wake_word(self, wake_word: str) -> None:
         """
@@ -117,8 +219,10 @@ class WakeWordDetector:
             wake_word: Phrase to remove (case-insensitive)
         """
         normalised = wake_word.lower().strip()
-        if normalised in self.wake_words:
-            self.wake_words.remove(normalised)
+        if normalised not in self._wake_set:
+            return
+        del self._wake_set[normalised]
+        self._rebuild_matcher()
 
     def set_stt_engine(self, stt_engine) -> None:
         """
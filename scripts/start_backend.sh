@@ -36,5 +36,11 @@ echo "Installing dependencies..."
 pip install -q -r requirements.txt
 
 # Start FastAPI server
-echo "✨ Starting FastAPI server on http://localhost:8000"
+# API_WORKERS > 1 runs several processes (set REDIS_URL to share history).
+# Whisper and piper already run outside the GIL, so one worker suits most setups.
+API_WORKERS="${API_WORKERS:-1}"
+echo "✨ Starting FastAPI server on http://localhost:8000 ($API_WORKERS worker(s))"
+if [ "$API_WORKERS" -gt 1 ]; then
+    exec uvicorn main:app --host 0.0.0.0 --port 8000 --workers "$API_WORKERS"
+fi
 python main.py
@@ -10,6 +10,9 @@ CONTEXT_SIZE="${CONTEXT_SIZE:-4096}"
 GPU_LAYERS="${GPU_LAYERS:-20}"
 HOST="${HOST:-0.0.0.0}"
 PORT="${PORT:-8001}"
+# Parallel slots; keep in sync with LLAMA_CPP_SLOTS for the backend.
+# The context size is split evenly between slots.
+PARALLEL="${PARALLEL:-1}"
 
 # Check if model exists
 if [ ! -f "$MODEL_PATH" ]; then
@@ -40,6 +43,7 @@ fi
 echo "Model: $MODEL_PATH"
 echo "Context: $CONTEXT_SIZE"
 echo "GPU Layers: $GPU_LAYERS"
+echo "Slots: $PARALLEL"
 echo "Host: $HOST:$PORT"
 echo ""
 
@@ -50,6 +54,7 @@ $SERVER_BIN \
     -ngl "$GPU_LAYERS" \
     --host "$HOST" \
     --port "$PORT" \
+    --parallel "$PARALLEL" \
     --n-predict 256 \
     --threads 4
 